@@ -1,4 +1,4 @@
-from models import add_user
+from bulk import import_data
 
 # Add new users with password 'claude101'
 new_users = [
@@ -7,9 +7,8 @@ new_users = [
     'kasey', 'wesley', 'deidra'
 ]
 
-for name in new_users:
-    # Capitalize first letter for storage
-    capitalized_name = name.capitalize()
-    add_user(capitalized_name, 'claude101')
+# Capitalize first letter for storage; users that already exist are skipped
+counts = import_data({'users': [{'first_name': name.capitalize(), 'password': 'claude101'}
+                                for name in new_users]})
 
-print(f"\nAdded {len(new_users)} users successfully!")
+print(f"\nAdded {counts['users']} users successfully!")
@@ -1,77 +1,168 @@
-from flask import Flask, render_template, request, redirect, url_for, session
+from flask import (Flask, Blueprint, render_template, stream_template, request, redirect, url_for, session,
+                   Response, make_response, stream_with_context, jsonify)
 from functools import wraps
+from werkzeug.serving import is_running_from_reloader
 from datetime import datetime, timedelta
 import os
+import hashlib
+import json
+import io
+import csv
+import atexit
+import queue
+import threading
 import logging
-from logging.handlers import RotatingFileHandler
-import time
+from logging.handlers import RotatingFileHandler, WatchedFileHandler, QueueListener
+import db
+import tracing
+import backups
+import prewarm
+import bulk
+from markupsafe import Markup
+from cache import ByteLRUCache
+from config import Config
 from models import (
     authenticate_user, get_all_users, create_task, update_task, get_task,
-    get_task_assignments, delete_task, add_schedule, get_schedules, delete_schedule,
-    get_schedule_description, get_all_tasks_alphabetical, get_tasks_for_date_range,
-    calculate_next_occurrence, get_ordinal, get_user_by_id, update_user_password,
-    delete_user, backup_database
-)
-
-app = Flask(__name__)
-app.secret_key = 'change-this-to-something-random'  # For session management
-
-# Configure logging
-log_formatter = logging.Formatter(
-    '%(asctime)s [%(levelname)s] [%(name)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-
-# File handler with rotation (10MB max, keep 5 backups)
-file_handler = RotatingFileHandler('app.log', maxBytes=10*1024*1024, backupCount=5)
-file_handler.setFormatter(log_formatter)
-file_handler.setLevel(logging.DEBUG)
-
-# Console handler
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(log_formatter)
-console_handler.setLevel(logging.INFO)
-
-# Configure root logger
-logging.basicConfig(
-    level=logging.DEBUG,
-    handlers=[file_handler, console_handler]
+    get_task_assignments, delete_task, add_schedule, get_compiled_schedules, delete_schedule,
+    get_all_tasks_alphabetical, get_tasks_for_date_range,
+    iter_tasks_for_date_range, get_tasks_page_alphabetical, get_occurrences_page, count_tasks,
+    count_occurrences, get_tasks_for_user_date_range, get_next_due_tasks, prewarm_range,
+    refresh_occurrence_window,
+    get_ordinal, get_user_by_id, update_user_password,
+    delete_user, init_db, get_data_version
 )
 
+bp = Blueprint('main', __name__)
 logger = logging.getLogger(__name__)
-logger.info("="*60)
-logger.info("Flask application starting up")
-logger.info("="*60)
-
-# Request timing decorator
-def log_timing(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        start_time = time.time()
-        route_name = f.__name__
-        user = session.get('first_name', 'anonymous')
-
-        logger.info(f">>> REQUEST START: {route_name} | User: {user} | Method: {request.method}")
-
-        try:
-            result = f(*args, **kwargs)
-            elapsed = time.time() - start_time
-            logger.info(f"<<< REQUEST END: {route_name} | Duration: {elapsed:.3f}s")
-            return result
-        except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"!!! REQUEST FAILED: {route_name} | Duration: {elapsed:.3f}s | Error: {str(e)}")
-            raise
 
-    return decorated_function
+# Days ahead listed by the chronological All Tasks view, and rows per All Tasks page
+CHRONOLOGICAL_DAYS = 180
+ALL_TASKS_PER_PAGE = 50
+
+# (process, whether it uses a listener thread) as logging was last configured;
+# a forked worker sets it up again for itself
+_logging_setup = None
+_logging_lock = threading.Lock()
+
+def setup_logging(listener=True):
+    """Send log records through a queue to Config.LOG_FILE and the console, once per process
+
+    Pass listener=False in a process that forks workers (the gunicorn
+    master): records are then written directly and no thread is started.
+    """
+    global _logging_setup
+    with _logging_lock:
+        if _logging_setup == (os.getpid(), listener):
+            return
+        _logging_setup = (os.getpid(), listener)
+
+        # Configure logging
+        log_formatter = logging.Formatter(
+            '%(asctime)s [%(levelname)s] [%(name)s] %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+
+        # Console handler
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(log_formatter)
+        console_handler.setLevel(logging.INFO)
+        handlers = [console_handler]
+
+        if Config.LOG_FILE:
+            if Config.LOG_ROTATE:
+                # File handler with rotation (10MB max, keep 5 backups)
+                file_handler = RotatingFileHandler(Config.LOG_FILE, maxBytes=10*1024*1024, backupCount=5)
+            else:
+                # Shared by several processes: reopened when rotated externally
+                file_handler = WatchedFileHandler(Config.LOG_FILE)
+            file_handler.setFormatter(log_formatter)
+            file_handler.setLevel(logging.DEBUG)
+            handlers.append(file_handler)
+
+        if not listener:
+            logging.basicConfig(level=Config.LOG_LEVEL, handlers=handlers, force=True)
+            return
+
+        # Request threads only enqueue records; a listener thread formats and writes them
+        log_queue = queue.SimpleQueue()
+        queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        queue_listener.start()
+        atexit.register(queue_listener.stop)
+
+        # Configure root logger (force replaces handlers inherited from a parent process)
+        logging.basicConfig(
+            level=Config.LOG_LEVEL,
+            handlers=[tracing.DeferredQueueHandler(log_queue)],
+            force=True
+        )
+
+def run_startup_tasks(forks=False):
+    """Bring the database up to date; run once per server start, before serving
+
+    forks is true when this process goes on to fork the serving processes
+    (the gunicorn master), so nothing here may leave a thread running.
+    """
+    setup_logging(listener=not forks)
+    logger.info("="*60)
+    logger.info("Task Schedule starting up")
+    logger.info("="*60)
+
+    # Create any tables added since the database was first initialized
+    init_db()
+
+    # Don't hand this process's connections to forked workers
+    db.close_all_pools()
+
+def warm_caches(app, today):
+    """Fill this process's caches for today's first page views (run by the prewarm thread)
+
+    Rolls the occurrence window and next-due index forward, then caches the
+    home page's day cards and this month for view_tasks. The chronological
+    view's first page and count are queried, not cached, so running them
+    loads their pages into this process's SQLite connections; its full list
+    (show_all) goes in the range cache. Cards and ranges kept from yesterday
+    are reused, so after midnight only the day entering each window is read.
+    """
+    refresh_occurrence_window(today=today)
+    get_next_due_tasks(0, 1, today=today)
+    prewarm_range(*month_bounds(today.year, today.month))
+    end_date = today + timedelta(days=CHRONOLOGICAL_DAYS)
+    get_occurrences_page(today, end_date, per_page=ALL_TASKS_PER_PAGE)
+    count_occurrences(today, end_date)
+    prewarm_range(today, end_date)
+    # Card templates build URLs, which needs a request context
+    with app.test_request_context('/'):
+        render_day_cards(today)
+
+def start_prewarm_thread(app):
+    """Warm this process's caches now and after each midnight; call in every serving process"""
+    return prewarm.start_prewarm_thread(lambda today: warm_caches(app, today))
+
+def start_background_threads(app):
+    """Start the threads of a serving process: cache pre-warming, and backups if it wins the backup lock
+
+    Call once the process serves requests (in each gunicorn worker, not the
+    master that forks them), so no thread or database handle crosses a fork.
+    """
+    start_prewarm_thread(app)
+    backups.start_backup_thread()
+
+def create_app():
+    """Build the Flask app (settings come from Config, read when the modules are imported)"""
+    setup_logging()
+    app = Flask(__name__)
+    app.secret_key = 'change-this-to-something-random'  # For session management
+    db.init_app(app)
+    tracing.init_app(app)
+    app.register_blueprint(bp)
+    return app
 
 # Simple auth decorator
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'logged_in' not in session:
-            logger.debug(f"Login required - redirecting to login page")
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -80,70 +171,121 @@ def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'logged_in' not in session:
-            logger.debug(f"Admin required - not logged in, redirecting to login")
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         if session.get('first_name', '').lower() != 'admin':
-            logger.warning(f"Admin required - user {session.get('first_name')} denied access")
-            return redirect(url_for('index'))
+            logger.warning("Admin required - user %s denied access", session.get('first_name'))
+            return redirect(url_for('main.index'))
         return f(*args, **kwargs)
     return decorated_function
 
-@app.route('/login', methods=['GET', 'POST'])
-@log_timing
+def today_window():
+    """Pages whose dates are relative to today change at midnight"""
+    return datetime.now().date()
+
+def request_etag(window=None):
+    """Strong ETag for a read page from the data version, the user, the request and its window"""
+    parts = (get_data_version(), session.get('user_id'), session.get('first_name'),
+             request.path, sorted(request.args.items(multi=True)), window)
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+# Conditional GET decorator (ETag / 304 Not Modified)
+def conditional_get(window=None):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = request_etag(window() if window else None)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+            response.set_etag(etag)
+            # Pages are per user: let browsers keep them but always revalidate
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         first_name = request.form.get('first_name')
         password = request.form.get('password')
-        logger.debug(f"Login attempt for user: {first_name}")
 
-        if authenticate_user(first_name, password):
+        user = authenticate_user(first_name, password)
+        if user:
             session['logged_in'] = True
             session['first_name'] = first_name
-            logger.info(f"User {first_name} logged in successfully")
-            return redirect(url_for('index'))
-        logger.warning(f"Failed login attempt for user: {first_name}")
+            session['user_id'] = user['id']
+            logger.info("User %s logged in successfully", first_name)
+            return redirect(url_for('main.index'))
+        logger.warning("Failed login attempt for user: %s", first_name)
         return render_template('login.html', error='Invalid credentials')
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     session.pop('logged_in', None)
     session.pop('first_name', None)
-    return redirect(url_for('login'))
+    session.pop('user_id', None)
+    return redirect(url_for('main.login'))
+
+# Rendered day cards: (date, data version, user_id or None for everyone) -> HTML
+day_card_cache = ByteLRUCache(Config.FRAGMENT_CACHE_BYTES)
+
+def render_day_cards(today, user_id=None):
+    """HTML for the next 7 days' cards, rendering only the cards not already cached"""
+    version = get_data_version()
+    dates = [today + timedelta(days=i) for i in range(7)]
+    cards = {date: day_card_cache.get((date, version, user_id)) for date in dates}
+
+    missing = [date for date in dates if cards[date] is None]
+    if missing:
+        start_date, end_date = missing[0], missing[-1]
+        if user_id is None:
+            occurrences = get_tasks_for_date_range(start_date, end_date)
+        else:
+            occurrences = get_tasks_for_user_date_range(user_id, start_date, end_date)
+
+        # Group by date
+        days = {}
+        for date in missing:
+            days[date] = {
+                'day_name': date.strftime('%A'),
+                'date_str': date.strftime('%m/%d/%Y'),
+                'tasks': []
+            }
+        for occ in occurrences:
+            if occ['date'] in days:
+                days[occ['date']]['tasks'].append(occ)
+
+        for date, day in days.items():
+            cards[date] = render_template('_day_card.html', day=day)
+            day_card_cache.set((date, version, user_id), cards[date])
+
+    return Markup(''.join(cards[date] for date in dates))
 
-@app.route('/')
+@bp.route('/')
 @login_required
-@log_timing
+@conditional_get(window=today_window)
 def index():
     # Get tasks for next 7 days
     today = datetime.now().date()
-    end_date = today + timedelta(days=6)
-    logger.debug(f"Loading home page: {today} to {end_date}")
-
-    start = time.time()
-    occurrences = get_tasks_for_date_range(today, end_date)
-    logger.debug(f"get_tasks_for_date_range completed: {time.time() - start:.3f}s | Found {len(occurrences)} occurrences")
-
-    # Group by date
-    days = {}
-    for i in range(7):
-        date = today + timedelta(days=i)
-        days[date] = {
-            'day_name': date.strftime('%A'),
-            'date_str': date.strftime('%m/%d/%Y'),
-            'tasks': []
-        }
-
-    for occ in occurrences:
-        if occ['date'] in days:
-            days[occ['date']]['tasks'].append(occ)
+    return render_template('index.html', cards=render_day_cards(today))
 
-    days_list = [{'date': k, 'data': v} for k, v in sorted(days.items())]
-    logger.debug(f"Rendering index.html with {len(days_list)} days")
+@bp.route('/my')
+@login_required
+@conditional_get(window=today_window)
+def my_tasks():
+    user_id = session.get('user_id')
+    if user_id is None:
+        # Logged in before user ids were kept in the session
+        session.clear()
+        return redirect(url_for('main.login'))
 
-    return render_template('index.html', days=days_list)
+    today = datetime.now().date()
+    return render_template('index.html', cards=render_day_cards(today, user_id), my_tasks=True)
 
-@app.route('/tasks/create', methods=['GET', 'POST'])
+@bp.route('/tasks/create', methods=['GET', 'POST'])
 @login_required
 def create_task_route():
     if request.method == 'POST':
@@ -159,27 +301,28 @@ def create_task_route():
         task_id = create_task(title, description, for_everyone, user_ids, created_by)
 
         # Handle schedules (we'll add UI for this later, for now just redirect)
-        return redirect(url_for('edit_task_route', task_id=task_id))
+        return redirect(url_for('main.edit_task_route', task_id=task_id))
 
     users = get_all_users()
     return render_template('create_task.html', users=users)
 
-@app.route('/tasks/<int:task_id>/edit', methods=['GET', 'POST'])
+@bp.route('/tasks/<int:task_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_task_route(task_id):
     task = get_task(task_id)
     if not task:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     if request.method == 'POST':
         if 'delete_task' in request.form:
             delete_task(task_id)
-            return redirect(url_for('all_tasks'))
+            return redirect(url_for('main.all_tasks'))
 
         if 'delete_schedule' in request.form:
-            schedule_id = request.form.get('delete_schedule')
-            delete_schedule(schedule_id)
-            return redirect(url_for('edit_task_route', task_id=task_id))
+            schedule_id = request.form.get('delete_schedule', type=int)
+            if schedule_id is not None:
+                delete_schedule(schedule_id)
+            return redirect(url_for('main.edit_task_route', task_id=task_id))
 
         if 'add_schedule' in request.form:
             schedule_type = request.form.get('schedule_type')
@@ -233,7 +376,7 @@ def edit_task_route(task_id):
                 kwargs['specific_date'] = request.form.get('specific_date')
 
             add_schedule(task_id, schedule_type, **kwargs)
-            return redirect(url_for('edit_task_route', task_id=task_id))
+            return redirect(url_for('main.edit_task_route', task_id=task_id))
 
         else:
             title = request.form.get('title')
@@ -244,74 +387,123 @@ def edit_task_route(task_id):
             if not for_everyone:
                 user_ids = request.form.getlist('user_ids')
 
-            update_task(task_id, title, description, for_everyone, user_ids)
-            return redirect(url_for('edit_task_route', task_id=task_id))
+            changes = update_task(task_id, title, description, for_everyone, user_ids)
+            logger.info("Task %d saved by %s: %s", task_id, session.get('first_name'), changes)
+            return redirect(url_for('main.edit_task_route', task_id=task_id))
 
     users = get_all_users()
     assigned_users = get_task_assignments(task_id)
-    schedules = get_schedules(task_id)
+    schedules = get_compiled_schedules(task_id)
 
     schedule_list = []
     for s in schedules:
         schedule_list.append({
-            'id': s['id'],
-            'description': get_schedule_description(s)
+            'id': s.id,
+            'description': s.description
         })
 
     return render_template('edit_task.html', task=task, users=users,
                           assigned_users=assigned_users, schedules=schedule_list)
 
-@app.route('/tasks/all')
+@bp.route('/tasks/all')
 @login_required
-@log_timing
+@conditional_get(window=today_window)
 def all_tasks():
     view = request.args.get('view', 'alphabetical')
     page = int(request.args.get('page', 1))
     show_all = request.args.get('show_all', '0') == '1'
-    logger.debug(f"all_tasks: view={view}, page={page}, show_all={show_all}")
-
-    if view == 'alphabetical':
-        start = time.time()
-        tasks = get_all_tasks_alphabetical()
-        logger.debug(f"get_all_tasks_alphabetical completed: {time.time() - start:.3f}s | {len(tasks)} tasks")
-    else:
-        # Chronological view - get all tasks with occurrences for next 6 months
-        today = datetime.now().date()
-        end_date = today + timedelta(days=180)
-        logger.debug(f"Loading chronological view: {today} to {end_date}")
-        start = time.time()
-        occurrences = get_tasks_for_date_range(today, end_date)
-        logger.debug(f"get_tasks_for_date_range completed: {time.time() - start:.3f}s | {len(occurrences)} occurrences")
-
-        tasks = []
-        for occ in occurrences:
-            tasks.append({
-                'id': occ['task_id'],
-                'title': occ['task_title'],
-                'date': occ['date'].strftime('%m/%d/%Y'),
-                'assigned_to': occ['assigned_to']
-            })
-
-    total_tasks = len(tasks)
-    per_page = 50
+    per_page = ALL_TASKS_PER_PAGE
+    today = datetime.now().date()
+    # Chronological view - all task occurrences for the next 6 months
+    end_date = today + timedelta(days=CHRONOLOGICAL_DAYS)
 
     if show_all:
-        paginated_tasks = tasks
-        total_pages = 1
-    else:
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_tasks = tasks[start:end]
-        total_pages = (total_tasks + per_page - 1) // per_page
+        if view == 'alphabetical':
+            tasks = get_all_tasks_alphabetical()
+        elif view == 'next_due':
+            tasks = [chronological_entry(entry) for entry in get_next_due_tasks(today=today)[0]]
+        else:
+            tasks = [chronological_entry(occ) for occ in get_tasks_for_date_range(today, end_date)]
+        return render_template('all_tasks.html', tasks=tasks, view=view, page=1, total_pages=1,
+                               show_all=True, total_tasks=len(tasks))
 
-    return render_template('all_tasks.html', tasks=paginated_tasks, view=view,
+    # Pages after the first carry a cursor naming the row at the page boundary
+    after = request.args.get('after')
+    before = request.args.get('before')
+    if view == 'alphabetical':
+        tasks, has_previous, has_next = get_tasks_page_alphabetical(
+            after=parse_task_cursor(after), before=parse_task_cursor(before), per_page=per_page)
+        total_tasks = count_tasks()
+        previous_cursor = str(tasks[0]['id']) if tasks else None
+        next_cursor = str(tasks[-1]['id']) if tasks else None
+    elif view == 'next_due':
+        # Pages of an in-memory ordering, so plain page numbers are enough
+        page = max(1, page)
+        entries, total_tasks = get_next_due_tasks((page - 1) * per_page, per_page, today=today)
+        tasks = [chronological_entry(entry) for entry in entries]
+        has_previous = page > 1
+        has_next = page * per_page < total_tasks
+        previous_cursor = next_cursor = None
+    else:
+        occurrences, has_previous, has_next = get_occurrences_page(
+            today, end_date, after=parse_occurrence_cursor(after),
+            before=parse_occurrence_cursor(before), per_page=per_page)
+        total_tasks = count_occurrences(today, end_date)
+        tasks = [chronological_entry(occ) for occ in occurrences]
+        previous_cursor = occurrence_cursor(occurrences[0]) if occurrences else None
+        next_cursor = occurrence_cursor(occurrences[-1]) if occurrences else None
+
+    if not has_previous:
+        page = 1
+    total_pages = max(page, (total_tasks + per_page - 1) // per_page)
+
+    return render_template('all_tasks.html', tasks=tasks, view=view,
                           page=page, total_pages=total_pages, show_all=show_all,
-                          total_tasks=total_tasks)
+                          total_tasks=total_tasks, has_previous=has_previous, has_next=has_next,
+                          previous_cursor=previous_cursor, next_cursor=next_cursor)
 
-@app.route('/tasks/view')
+@bp.route('/tasks/next-due.json')
 @login_required
-def view_tasks():
-    # Get date range from query params
+@conditional_get(window=today_window)
+def next_due_json():
+    """Tasks by next due date: ?offset=0&limit=50"""
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', 50, type=int)
+    entries, total = get_next_due_tasks(offset, max(1, min(limit, 500)))
+    return jsonify(total=total, offset=offset, tasks=[{
+        'task_id': entry['task_id'],
+        'title': entry['task_title'],
+        'assigned_to': entry['assigned_to'],
+        'next_due': entry['date'].isoformat(),
+    } for entry in entries])
+
+def chronological_entry(occ):
+    return {
+        'id': occ['task_id'],
+        'title': occ['task_title'],
+        'date': occ['date'].strftime('%m/%d/%Y'),
+        'assigned_to': occ['assigned_to']
+    }
+
+def occurrence_cursor(occ):
+    return f"{occ['date'].isoformat()}.{occ['task_id']}.{occ['schedule_id']}"
+
+def parse_occurrence_cursor(value):
+    """(date, task_id, schedule_id) from an occurrence_cursor() string, or None"""
+    try:
+        day, task_id, schedule_id = value.split('.')
+        return datetime.strptime(day, '%Y-%m-%d').date(), int(task_id), int(schedule_id)
+    except (AttributeError, ValueError):
+        return None
+
+def parse_task_cursor(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def requested_date_range():
+    """(start_date, end_date) from the start/end or month query parameters, default this month"""
     start_str = request.args.get('start')
     end_str = request.args.get('end')
     month_str = request.args.get('month')
@@ -323,74 +515,139 @@ def view_tasks():
     elif month_str:
         # Month format: YYYY-MM
         year, month = map(int, month_str.split('-'))
-        start_date = datetime(year, month, 1).date()
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-        else:
-            end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
+        start_date, end_date = month_bounds(year, month)
     else:
         # Default to current month
         today = datetime.now().date()
-        start_date = datetime(today.year, today.month, 1).date()
-        if today.month == 12:
-            end_date = datetime(today.year + 1, 1, 1).date() - timedelta(days=1)
-        else:
-            end_date = datetime(today.year, today.month + 1, 1).date() - timedelta(days=1)
-
-    occurrences = get_tasks_for_date_range(start_date, end_date)
-
-    # Format for print view
-    print_lines = []
-    for occ in occurrences:
-        date_str = occ['date'].strftime('%m/%d/%Y')
-        day_str = occ['date'].strftime('%a').upper()
-        print_lines.append(f"{date_str} {day_str} {occ['task_title']} ({occ['assigned_to']})")
-
-    return render_template('view_tasks.html', print_lines=print_lines,
-                          start_date=start_date, end_date=end_date)
+        start_date, end_date = month_bounds(today.year, today.month)
+    return start_date, end_date
+
+def month_bounds(year, month):
+    """First and last day of a month"""
+    start_date = datetime(year, month, 1).date()
+    if month == 12:
+        end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
+    else:
+        end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
+    return start_date, end_date
 
-@app.route('/about')
+@bp.route('/tasks/view')
+@login_required
+@conditional_get(window=today_window)
+def view_tasks():
+    start_date, end_date = requested_date_range()
+    occurrences = iter_tasks_for_date_range(start_date, end_date)
+
+    # Format for print view, streamed as the template renders
+    print_lines = (
+        f"{occ['date'].strftime('%m/%d/%Y')} {occ['date'].strftime('%a').upper()} "
+        f"{occ['task_title']} ({occ['assigned_to']})"
+        for occ in occurrences
+    )
+
+    return stream_template('view_tasks.html', print_lines=print_lines,
+                           start_date=start_date, end_date=end_date)
+
+def csv_chunks(occurrences, rows_per_chunk=500):
+    """Yield occurrences as CSV text, a chunk of rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['date', 'day', 'task_id', 'task', 'assigned_to'])
+    for i, occ in enumerate(occurrences, 1):
+        writer.writerow([occ['date'].isoformat(), occ['date'].strftime('%a'),
+                         occ['task_id'], occ['task_title'], occ['assigned_to']])
+        if i % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+@bp.route('/tasks/export.csv')
+@login_required
+def export_tasks_csv():
+    start_date, end_date = requested_date_range()
+    occurrences = iter_tasks_for_date_range(start_date, end_date)
+    filename = f"tasks_{start_date.isoformat()}_{end_date.isoformat()}.csv"
+    return Response(stream_with_context(csv_chunks(occurrences)), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@bp.route('/about')
 @login_required
 def about():
     return render_template('about.html')
 
-@app.route('/admin/users')
+@bp.route('/admin/users')
 @admin_required
+@conditional_get()
 def admin_users():
     users = get_all_users()
     return render_template('admin_users.html', users=users)
 
-@app.route('/admin/users/<int:user_id>/edit', methods=['GET', 'POST'])
+@bp.route('/admin/export.<fmt>')
+@admin_required
+def admin_export(fmt):
+    if fmt not in ('json', 'csv'):
+        return redirect(url_for('main.admin_users'))
+    chunks = bulk.export_json() if fmt == 'json' else bulk.export_tasks_csv()
+    mimetype = 'application/json' if fmt == 'json' else 'text/csv'
+    filename = f"taskschedule_{datetime.now():%Y%m%d}.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@bp.route('/admin/import', methods=['POST'])
+@admin_required
+def admin_import():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return redirect(url_for('main.admin_users'))
+
+    text = upload.read().decode('utf-8-sig')
+    try:
+        data = bulk.read_tasks_csv(text) if upload.filename.lower().endswith('.csv') else json.loads(text)
+        result = bulk.import_data(data)
+    except bulk.BulkImportError as e:
+        return render_template('admin_users.html', users=get_all_users(), import_errors=e.errors)
+    except ValueError as e:
+        return render_template('admin_users.html', users=get_all_users(), import_errors=[f"Unreadable file: {e}"])
+    logger.info("Bulk import by %s: %s", session.get('first_name'), result)
+    return render_template('admin_users.html', users=get_all_users(), import_result=result)
+
+@bp.route('/admin/users/<int:user_id>/edit', methods=['GET', 'POST'])
 @admin_required
 def edit_user(user_id):
     user = get_user_by_id(user_id)
     if not user:
-        return redirect(url_for('admin_users'))
+        return redirect(url_for('main.admin_users'))
 
     if request.method == 'POST':
         new_password = request.form.get('password')
         if new_password:
             update_user_password(user_id, new_password)
-            return redirect(url_for('admin_users'))
+            return redirect(url_for('main.admin_users'))
 
     return render_template('edit_user.html', user=user)
 
-@app.route('/admin/users/<int:user_id>/delete', methods=['POST'])
+@bp.route('/admin/users/<int:user_id>/delete', methods=['POST'])
 @admin_required
 def delete_user_route(user_id):
     user = get_user_by_id(user_id)
     if user and user['first_name'].lower() != 'admin':
         delete_user(user_id)
-    return redirect(url_for('admin_users'))
+    return redirect(url_for('main.admin_users'))
 
-@app.context_processor
+@bp.app_context_processor
 def utility_processor():
     """Make utility functions available to all templates"""
     return dict(get_ordinal=get_ordinal)
 
 if __name__ == '__main__':
-    # Backup database before starting
-    backup_database()
+    # With debug on this process only watches for changes; the reloaded child serves
+    if not Config.DEBUG or is_running_from_reloader():
+        run_startup_tasks()
+
+    app = create_app()
+    if not Config.DEBUG or is_running_from_reloader():
+        start_background_threads(app)
 
     # Run on all network interfaces so other devices can access
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=Config.DEBUG)
@@ -0,0 +1,159 @@
+"""
+Online database backups.
+
+Snapshots are taken with SQLite's backup API, a few pages per step, so
+requests keep reading and writing while the copy runs and the copy is
+always consistent. Each snapshot is gzipped into Config.BACKUP_DIR, named
+with its time and the data version it contains; a run is skipped when the
+newest snapshot already has the current data version, and only the newest
+Config.BACKUP_KEEP snapshots are kept.
+
+start_backup_thread() takes a snapshot right away and then every
+Config.BACKUP_INTERVAL_HOURS in a background thread. Every serving process
+calls it but only one runs backups: the one holding the lock file in
+Config.BACKUP_DIR. The lock is released when that process exits, and the
+next process to call start_backup_thread() (such as the worker gunicorn
+starts in its place) takes over.
+
+Usage: python backups.py  (take one snapshot now)
+"""
+import glob
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the single-process development server runs there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def _snapshot_prefix():
+    name = os.path.splitext(os.path.basename(Config.DATABASE))[0]
+    return os.path.join(Config.BACKUP_DIR, name)
+
+def list_snapshots():
+    """Snapshot paths, oldest first"""
+    return sorted(glob.glob(f"{_snapshot_prefix()}-*.db.gz"))
+
+def _snapshot_version(path):
+    match = re.search(r'-v(\d+)\.db\.gz$', path)
+    return int(match.group(1)) if match else None
+
+def _read_data_version(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+    return int(row[0]) if row else 0
+
+def prune_snapshots(keep=None):
+    """Delete all but the newest keep snapshots; returns the paths removed"""
+    keep = Config.BACKUP_KEEP if keep is None else keep
+    snapshots = list_snapshots()
+    removed = snapshots[:max(0, len(snapshots) - keep)]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+def backup_database(force=False):
+    """Write a compressed snapshot of the database; returns its path, or None if skipped"""
+    start_time = time.time()
+    if not os.path.exists(Config.DATABASE):
+        logger.info("No database to backup yet")
+        return None
+    os.makedirs(Config.BACKUP_DIR, exist_ok=True)
+
+    source = sqlite3.connect(Config.DATABASE)
+    try:
+        try:
+            version = _read_data_version(source)
+        except sqlite3.OperationalError:
+            version = 0  # Database from before the meta table
+        snapshots = list_snapshots()
+        if not force and snapshots and _snapshot_version(snapshots[-1]) == version:
+            logger.info("Backup skipped: no changes since %s", os.path.basename(snapshots[-1]))
+            return None
+
+        path = f"{_snapshot_prefix()}-{datetime.now():%Y%m%d-%H%M%S}-v{version}.db.gz"
+        copy_path = f"{path}.tmp.db"
+        dest = sqlite3.connect(copy_path)
+        try:
+            # Copy a few pages at a time, pausing between steps so writers get the lock
+            source.backup(dest, pages=Config.BACKUP_PAGES_PER_STEP, sleep=Config.BACKUP_STEP_SLEEP)
+        finally:
+            dest.close()
+    finally:
+        source.close()
+
+    try:
+        with open(copy_path, 'rb') as src, gzip.open(f"{path}.tmp", 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(f"{path}.tmp", path)
+    finally:
+        for leftover in (copy_path, f"{path}.tmp"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    removed = prune_snapshots()
+    logger.info("Database backed up: %s (took %.3fs, %d old snapshots removed)",
+                path, time.time() - start_time, len(removed))
+    return path
+
+class BackupThread(threading.Thread):
+    """Takes a snapshot now and then every interval seconds until stopped"""
+
+    def __init__(self, interval):
+        super().__init__(name='backups', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                backup_database()
+            except Exception:
+                logger.exception("Backup failed")
+            if self.stopped.wait(self.interval):
+                return
+
+    def stop(self):
+        self.stopped.set()
+
+_backup_thread = None
+_lock_file = None
+
+def _take_backup_lock():
+    """True if this process holds (or just took) the lock that elects the backup process"""
+    global _lock_file
+    if _lock_file is not None or fcntl is None:
+        return True
+    os.makedirs(Config.BACKUP_DIR, exist_ok=True)
+    lock_file = open(os.path.join(Config.BACKUP_DIR, '.lock'), 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _lock_file = lock_file  # Held open for the life of the process
+    return True
+
+def start_backup_thread():
+    """Start the backup thread in this process if it holds the backup lock and the thread isn't running"""
+    global _backup_thread
+    if not _take_backup_lock():
+        return None
+    if _backup_thread is None or not _backup_thread.is_alive():
+        _backup_thread = BackupThread(Config.BACKUP_INTERVAL_HOURS * 3600)
+        _backup_thread.start()
+    return _backup_thread
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    path = backup_database(force=True)
+    print(f"Database backed up: {path}" if path else "No database to backup yet")
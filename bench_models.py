@@ -0,0 +1,269 @@
+"""
+Benchmark the models layer against a synthetic household.
+
+Builds a temporary SQLite database with N users and M tasks using a
+realistic mix of every schedule type, times the hot read and write paths,
+and prints the results as JSON so runs can be compared between commits.
+
+Usage: python bench_models.py [--users 15] [--tasks 300] [--iterations 50] [--output results.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import logging
+from datetime import date, timedelta
+from config import Config
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# schedule_type -> relative weight in a typical household
+SCHEDULE_MIX = {
+    'weekly': 20,
+    'monthly_date': 10,
+    'interval_days': 8,
+    'interval_weeks': 8,
+    'interval_months': 10,
+    'ordinal_monthly': 6,
+    'ordinal_bimonthly': 3,
+    'first_of_month': 4,
+    'last_of_month': 3,
+    'first_last_interval_months': 3,
+    'times_per_month': 4,
+    'yearly_week': 3,
+    'yearly_date': 6,
+    'seasonal': 4,
+    'one_time': 8,
+}
+
+def random_schedule(rng, today):
+    """Return (schedule_type, fields) for a random schedule"""
+    schedule_type = rng.choices(list(SCHEDULE_MIX), weights=list(SCHEDULE_MIX.values()))[0]
+    start = today + timedelta(days=rng.randint(-365, 60))
+    fields = {}
+    if schedule_type in ('interval_days', 'interval_weeks', 'interval_months', 'first_last_interval_months'):
+        fields['interval'] = rng.choice([1, 2, 3, 6]) if schedule_type != 'interval_days' else rng.randint(1, 30)
+        fields['start_date'] = start.isoformat()
+        if rng.random() < 0.2:
+            fields['end_date'] = (start + timedelta(days=rng.randint(30, 900))).isoformat()
+        if schedule_type == 'first_last_interval_months':
+            fields['first_or_last'] = rng.choice(['first', 'last'])
+    elif schedule_type == 'weekly':
+        fields['day_of_week'] = rng.choice(DAYS)
+    elif schedule_type in ('ordinal_monthly', 'ordinal_bimonthly'):
+        fields['ordinal'] = rng.choice(['first', 'second', 'third', 'fourth', 'last'])
+        fields['day_of_week'] = rng.choice(DAYS)
+        if schedule_type == 'ordinal_bimonthly':
+            fields['even_odd_months'] = rng.choice(['even', 'odd'])
+    elif schedule_type == 'monthly_date':
+        fields['day_of_month'] = rng.randint(1, 31)
+    elif schedule_type == 'times_per_month':
+        fields['times_count'] = rng.randint(2, 4)
+    elif schedule_type == 'yearly_week':
+        fields['week_of_year'] = rng.randint(1, 52)
+        fields['month'] = rng.randint(1, 12)
+    elif schedule_type == 'yearly_date':
+        fields['month'] = rng.randint(1, 12)
+        fields['day_of_month'] = rng.randint(1, 28)
+    elif schedule_type == 'seasonal':
+        fields['season'] = rng.choice(['Spring', 'Summer', 'Fall', 'Winter'])
+    elif schedule_type == 'one_time':
+        fields['specific_date'] = (today + timedelta(days=rng.randint(-30, 365))).isoformat()
+    return schedule_type, fields
+
+def generate_household(n_users, n_tasks, seed=0):
+    """Fill the configured database with synthetic users, tasks, assignments and schedules"""
+    from db import get_db
+    from models import init_db
+
+    init_db()
+    rng = random.Random(seed)
+    today = date.today()
+    conn = get_db()
+    cursor = conn.cursor()
+
+    names = [f"User{i}" for i in range(n_users)]
+    cursor.executemany('INSERT INTO users (first_name, password) VALUES (?, ?)',
+                       [(name, 'password') for name in names])
+    cursor.execute('SELECT id FROM users')
+    user_ids = [row['id'] for row in cursor.fetchall()]
+
+    for i in range(n_tasks):
+        for_everyone = rng.random() < 0.4
+        cursor.execute(
+            'INSERT INTO tasks (title, description, for_everyone, created_by) VALUES (?, ?, ?, ?)',
+            (f"Task {i:05d}", 'Synthetic task', for_everyone, rng.choice(names))
+        )
+        task_id = cursor.lastrowid
+        if not for_everyone:
+            assigned = rng.sample(user_ids, rng.randint(1, min(4, len(user_ids))))
+            cursor.executemany('INSERT INTO task_assignments (task_id, user_id) VALUES (?, ?)',
+                               [(task_id, user_id) for user_id in assigned])
+        for _ in range(rng.choice([1, 1, 1, 2, 2, 3])):
+            schedule_type, fields = random_schedule(rng, today)
+            columns = ['task_id', 'schedule_type'] + list(fields)
+            cursor.execute(
+                f"INSERT INTO schedules ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})",
+                [task_id, schedule_type] + list(fields.values())
+            )
+
+    conn.commit()
+    conn.close()
+
+def measure(func, iterations, setup=None):
+    """Time func() iterations times; return ops/sec, p50/p99 (ms) and SQL statements per call"""
+    from db import statement_count as thread_statements
+    import writer
+
+    def statement_count():
+        # Writes run on the writer thread, which counts its own statements
+        return thread_statements() + writer.get_writer().statements
+
+    durations = []
+    statements = 0
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        before = statement_count()
+        start = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - start)
+        statements += statement_count() - before
+
+    durations.sort()
+    total = sum(durations)
+    return {
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / total, 1) if total else None,
+        'p50_ms': round(durations[len(durations) // 2] * 1000, 3),
+        'p99_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000, 3),
+        'queries_per_op': round(statements / iterations, 2),
+    }
+
+def measure_threads(func, threads, per_thread):
+    """Run func(thread, i) per_thread times on each of threads threads at once; ops/sec overall"""
+    import threading
+    import writer
+
+    before = writer.get_writer().stats()
+    workers = [threading.Thread(target=lambda t=t: [func(t, i) for i in range(per_thread)])
+               for t in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    after = writer.get_writer().stats()
+    batches = after['batches'] - before['batches']
+    return {
+        'threads': threads,
+        'ops_per_sec': round(threads * per_thread / elapsed, 1),
+        'writes_per_commit': round((after['mutations'] - before['mutations']) / batches, 2) if batches else None,
+    }
+
+def run_benchmarks(n_users, n_tasks, iterations, seed=0):
+    import models
+
+    generate_household(n_users, n_tasks, seed)
+    rng = random.Random(seed)
+    today = date.today()
+    results = {}
+
+    # Build the occurrence window up front so the first timed call isn't special
+    models.refresh_occurrence_window()
+
+    windows = {
+        '7_days': (today, today + timedelta(days=6)),
+        'month': (today.replace(day=1), today.replace(day=1) + timedelta(days=30)),
+        '180_days': (today, today + timedelta(days=180)),
+        '5_years': (today, today + timedelta(days=5 * 365)),
+    }
+    for name, (start, end) in windows.items():
+        results[f"get_tasks_for_date_range[{name}]"] = measure(
+            lambda i: models.get_tasks_for_date_range(start, end), iterations,
+            setup=lambda i: models.bump_data_version())
+        results[f"get_tasks_for_date_range[{name}, cached]"] = measure(
+            lambda i: models.get_tasks_for_date_range(start, end), iterations)
+
+    start, end = windows['7_days']
+    results['get_tasks_for_user_date_range[7_days]'] = measure(
+        lambda i: models.get_tasks_for_user_date_range(rng.randrange(1, n_users + 1), start, end), iterations,
+        setup=lambda i: models.bump_data_version())
+
+    from schedule_vectorized import expand_columnar, HAVE_NUMPY
+    conn = models.get_db()
+    _, _, schedules_by_task = models._load_tasks_bulk(conn.cursor())
+    conn.close()
+    schedules = [s for task_schedules in schedules_by_task.values() for s in task_schedules]
+    start, end = windows['5_years']
+    for backend in ('python', 'numpy') if HAVE_NUMPY else ('python',):
+        results[f"expand_columnar[5_years, {backend}]"] = measure(
+            lambda i: expand_columnar(schedules, start, end, backend), iterations)
+
+    results['get_next_due_tasks[50]'] = measure(lambda i: models.get_next_due_tasks(0, 50), iterations)
+
+    results['get_all_tasks_alphabetical'] = measure(
+        lambda i: models.get_all_tasks_alphabetical(), iterations)
+    results['authenticate_user'] = measure(
+        lambda i: models.authenticate_user(f"user{rng.randrange(n_users)}", 'password'), iterations)
+
+    created = []
+    results['create_task'] = measure(
+        lambda i: created.append(models.create_task(f"Bench task {i}", '', False, [1, 2], 'User0')),
+        iterations)
+    results['update_task'] = measure(
+        lambda i: models.update_task(created[i], f"Bench task {i} edited", '', False, [2, 3]),
+        iterations)
+    schedule_ids = []
+    results['add_schedule'] = measure(
+        lambda i: schedule_ids.append(models.add_schedule(created[i], 'weekly', day_of_week=DAYS[i % 7])),
+        iterations)
+    results['delete_schedule'] = measure(lambda i: models.delete_schedule(schedule_ids[i]), iterations)
+    results['update_task[8 threads]'] = measure_threads(
+        lambda t, i: models.update_task(created[i], f"Bench task {i} by {t}", '', False, [1 + t % 3]),
+        8, iterations)
+    results['delete_task'] = measure(lambda i: models.delete_task(created[i]), iterations)
+
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=15)
+    parser.add_argument('--tasks', type=int, default=300)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write JSON here instead of stdout')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)  # Keep per-call log lines out of the timings
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DATABASE = os.path.join(tmp, 'bench.db')
+        started = time.time()
+        with contextlib.redirect_stdout(sys.stderr):  # init_db prints progress
+            results = run_benchmarks(args.users, args.tasks, args.iterations, args.seed)
+        report = {
+            'users': args.users,
+            'tasks': args.tasks,
+            'iterations': args.iterations,
+            'seed': args.seed,
+            'elapsed_s': round(time.time() - started, 2),
+            'results': results,
+        }
+        from db import close_all_pools
+        close_all_pools()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,278 @@
+"""
+Bulk import and export of users, tasks, assignments and schedules.
+
+JSON holds everything; users are referred to by first name so a file can
+move between databases:
+
+    {"users": [{"first_name": "De", "password": "percy"}],
+     "tasks": [{"title": "Vacuum carpets", "description": "", "for_everyone": false,
+                "created_by": "De", "assigned_to": ["De"],
+                "schedules": [{"schedule_type": "weekly", "day_of_week": "Saturday"}]}]}
+
+CSV holds tasks only, one row per schedule, with assigned_to as a
+';'-separated list of first names. Rows with the same task_id belong to
+the same task; task_id only groups rows (exports write the task's id, and
+imported tasks get new ids). Rows without a task_id are grouped by title.
+
+An import is validated in full before anything is written, then loaded
+with executemany in one transaction. Existing users (matched on first name,
+ignoring case) are reused; tasks are always added. Exports stream rows out
+of the database as they are read.
+
+Usage: python bulk.py import FILE | python bulk.py export FILE
+"""
+import csv
+import io
+import json
+import sys
+from datetime import date
+from db import get_db
+from models import normalize_task_title, get_all_users, bulk_create
+from schedule_engine import HANDLERS, SCHEDULE_FIELDS, CompiledSchedule
+
+# Schedule columns an import may set
+SCHEDULE_COLUMNS = tuple(f for f in SCHEDULE_FIELDS if f not in ('id', 'task_id', 'schedule_type'))
+INTEGER_COLUMNS = ('interval', 'day_of_month', 'times_count', 'week_of_year', 'month')
+DATE_COLUMNS = ('start_date', 'end_date', 'specific_date')
+TASK_CSV_COLUMNS = ('task_id', 'title', 'description', 'for_everyone', 'created_by', 'assigned_to', 'schedule_type') + SCHEDULE_COLUMNS
+
+class BulkImportError(ValueError):
+    """An import file failed validation; errors lists every problem found"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} problem(s) in import: " + '; '.join(errors[:10]))
+        self.errors = errors
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return bool(value)
+
+def _validate_schedule(schedule, where, errors):
+    """Normalized schedule dict, or None after adding its problems to errors"""
+    if not isinstance(schedule, dict):
+        errors.append(f"{where}: must be an object")
+        return None
+    schedule_type = schedule.get('schedule_type')
+    if schedule_type not in HANDLERS:
+        errors.append(f"{where}: unknown schedule_type {schedule_type!r}")
+        return None
+    unknown = set(schedule) - set(SCHEDULE_COLUMNS) - {'schedule_type'}
+    if unknown:
+        errors.append(f"{where}: unknown fields {', '.join(sorted(unknown))}")
+        return None
+
+    row = {'schedule_type': schedule_type}
+    for column in SCHEDULE_COLUMNS:
+        value = schedule.get(column)
+        if value in (None, ''):
+            continue
+        try:
+            if column in INTEGER_COLUMNS:
+                value = int(value)
+            elif column in DATE_COLUMNS:
+                value = date.fromisoformat(str(value)).isoformat()
+            elif not isinstance(value, str):
+                raise TypeError(column)
+        except (TypeError, ValueError):
+            errors.append(f"{where}: bad {column} {value!r}")
+            return None
+        row[column] = value
+
+    if not CompiledSchedule(row).has_occurrences:
+        errors.append(f"{where}: missing or invalid fields for {schedule_type}")
+        return None
+    return row
+
+def _list_field(obj, field, where, errors):
+    """obj[field] as a list (empty when absent), or [] after adding a problem to errors"""
+    value = obj.get(field)
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        errors.append(f"{where}: {field} must be a list")
+        return []
+    return value
+
+def validate(data, existing_users):
+    """Check a whole import against the database's users (their case-folded first names).
+
+    Returns (users, tasks) normalized for loading; raises BulkImportError
+    listing every problem found.
+    """
+    errors = []
+    if not isinstance(data, dict):
+        raise BulkImportError(["top level must be an object with 'users' and/or 'tasks'"])
+
+    users = []
+    known = set(existing_users)
+    for i, user in enumerate(_list_field(data, 'users', 'top level', errors)):
+        where = f"users[{i}]"
+        if not isinstance(user, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+        name, password = user.get('first_name'), user.get('password')
+        if not isinstance(name, str) or not isinstance(password, str) or not name.strip() or not password:
+            errors.append(f"{where}: first_name and password are required strings")
+            continue
+        name = name.strip()
+        if name.casefold() in known:
+            continue  # Existing user, or listed twice
+        known.add(name.casefold())
+        users.append((name, user['password']))
+
+    tasks = []
+    for i, task in enumerate(_list_field(data, 'tasks', 'top level', errors)):
+        where = f"tasks[{i}]"
+        if not isinstance(task, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+        title = task.get('title')
+        if not isinstance(title, str) or not title.strip():
+            errors.append(f"{where}: title is required and must be a string")
+            continue
+        for field in ('description', 'created_by'):
+            if task.get(field) is not None and not isinstance(task[field], str):
+                errors.append(f"{where}: {field} must be a string")
+        for_everyone = _as_bool(task.get('for_everyone', True))
+        assigned_to = [] if for_everyone else list(dict.fromkeys(
+            str(name).strip().casefold() for name in _list_field(task, 'assigned_to', where, errors)
+            if str(name).strip()))
+        missing = [name for name in assigned_to if name not in known]
+        if missing:
+            errors.append(f"{where}: unknown users {', '.join(missing)}")
+        schedules = [_validate_schedule(s, f"{where}.schedules[{j}]", errors)
+                     for j, s in enumerate(_list_field(task, 'schedules', where, errors))]
+        tasks.append({
+            'title': normalize_task_title(title.strip()),
+            'description': task.get('description') or '',
+            'for_everyone': for_everyone,
+            'created_by': task.get('created_by'),
+            'assigned_to': assigned_to,
+            'schedules': schedules,
+        })
+
+    if errors:
+        raise BulkImportError(errors)
+    return users, tasks
+
+def import_data(data):
+    """Validate a parsed import (see module docstring), then load it in one transaction; returns counts of rows added"""
+    users, tasks = validate(data, {user['first_name'].casefold() for user in get_all_users()})
+    try:
+        return bulk_create(users, tasks)
+    except ValueError as e:
+        # A user deleted since validation
+        raise BulkImportError([str(e)])
+
+def read_tasks_csv(text):
+    """Parse the tasks CSV format into the import structure"""
+    tasks = {}
+    for row in csv.DictReader(io.StringIO(text)):
+        title = (row.get('title') or '').strip()
+        task_id = (row.get('task_id') or '').strip()
+        key = ('task_id', task_id) if task_id else ('title', title)
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = {
+                'title': title,
+                'description': row.get('description') or '',
+                'for_everyone': row.get('for_everyone', '1'),
+                'created_by': row.get('created_by') or None,
+                'assigned_to': [n for n in (row.get('assigned_to') or '').split(';') if n.strip()],
+                'schedules': [],
+            }
+        if row.get('schedule_type'):
+            task['schedules'].append({c: row[c] for c in ('schedule_type',) + SCHEDULE_COLUMNS
+                                      if row.get(c)})
+    return {'tasks': list(tasks.values())}
+
+def _task_rows(cursor):
+    """Yield (task, assigned first names, schedules) in task id order, streaming three ordered queries"""
+    conn = cursor.connection
+    assignments = conn.execute('''
+        SELECT ta.task_id, u.first_name FROM task_assignments ta
+        JOIN users u ON u.id = ta.user_id ORDER BY ta.task_id, ta.user_id
+    ''')
+    schedules = conn.execute('SELECT * FROM schedules ORDER BY task_id, id')
+    next_assignment = assignments.fetchone()
+    next_schedule = schedules.fetchone()
+
+    for task in cursor.execute('SELECT * FROM tasks ORDER BY id'):
+        # Skip rows of tasks that no longer exist, then collect this task's rows
+        names = []
+        while next_assignment is not None and next_assignment['task_id'] <= task['id']:
+            if next_assignment['task_id'] == task['id']:
+                names.append(next_assignment['first_name'])
+            next_assignment = assignments.fetchone()
+        task_schedules = []
+        while next_schedule is not None and next_schedule['task_id'] <= task['id']:
+            if next_schedule['task_id'] == task['id']:
+                task_schedules.append({c: next_schedule[c] for c in ('schedule_type',) + SCHEDULE_COLUMNS
+                                       if next_schedule[c] is not None})
+            next_schedule = schedules.fetchone()
+        yield task, names, task_schedules
+
+def export_json():
+    """Yield the whole database in the import format as JSON text, chunk by chunk"""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        yield '{"users": ['
+        for i, user in enumerate(cursor.execute('SELECT first_name, password FROM users ORDER BY id')):
+            yield (',' if i else '') + '\n  ' + json.dumps({'first_name': user['first_name'],
+                                                            'password': user['password']})
+        yield '\n], "tasks": ['
+        for i, (task, names, schedules) in enumerate(_task_rows(conn.cursor())):
+            yield (',' if i else '') + '\n  ' + json.dumps({
+                'title': task['title'],
+                'description': task['description'] or '',
+                'for_everyone': bool(task['for_everyone']),
+                'created_by': task['created_by'],
+                'assigned_to': names,
+                'schedules': schedules,
+            })
+        yield '\n]}\n'
+    finally:
+        conn.close()
+
+def export_tasks_csv():
+    """Yield tasks in the tasks CSV format, a row at a time"""
+    conn = get_db()
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TASK_CSV_COLUMNS)
+    try:
+        writer.writeheader()
+        for task, names, schedules in _task_rows(conn.cursor()):
+            base = {'task_id': task['id'], 'title': task['title'], 'description': task['description'] or '',
+                    'for_everyone': int(bool(task['for_everyone'])), 'created_by': task['created_by'] or '',
+                    'assigned_to': ';'.join(names)}
+            for schedule in schedules or [{}]:
+                writer.writerow(dict(base, **schedule))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    finally:
+        conn.close()
+
+def load_file(path):
+    """Parse a .json or tasks .csv import file"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return read_tasks_csv(text) if path.lower().endswith('.csv') else json.loads(text)
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] not in ('import', 'export'):
+        sys.exit(__doc__.strip().splitlines()[-1])
+    command, path = sys.argv[1:]
+    if command == 'import':
+        try:
+            counts = import_data(load_file(path))
+        except BulkImportError as e:
+            sys.exit('\n'.join(e.errors))
+        print(', '.join(f"{n} {what}" for what, n in counts.items()) + ' added')
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for chunk in (export_tasks_csv() if path.lower().endswith('.csv') else export_json()):
+                f.write(chunk)
+        print(f"Exported to {path}")
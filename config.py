@@ -4,9 +4,70 @@ class Config:
     # Database
     DATABASE = 'data/database.db'
 
+    # Online backups: gzipped snapshots every BACKUP_INTERVAL_HOURS (skipped when
+    # nothing changed), keeping the newest BACKUP_KEEP; the copy runs
+    # BACKUP_PAGES_PER_STEP pages at a time, sleeping BACKUP_STEP_SLEEP seconds between steps
+    BACKUP_DIR = 'data/backups'
+    BACKUP_INTERVAL_HOURS = 6
+    BACKUP_KEEP = 10
+    BACKUP_PAGES_PER_STEP = 256
+    BACKUP_STEP_SLEEP = 0.005
+
+    # SQLite connections: idle connections kept per database file, and
+    # PRAGMAs run once when each connection is opened
+    DB_POOL_SIZE = 5
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -8000,  # Negative means KiB, so 8 MB
+        'mmap_size': 64 * 1024 * 1024,
+        'foreign_keys': 'ON',
+        'busy_timeout': 5000,
+    }
+
+    # Writes run on one writer thread per process; those queued while it was busy,
+    # plus any arriving within WRITE_BATCH_WINDOW seconds (up to WRITE_BATCH_MAX),
+    # commit together. A window adds that much latency to every write.
+    WRITE_BATCH_WINDOW = 0
+    WRITE_BATCH_MAX = 64
+
+    # Materialized occurrences cover this many days either side of today
+    OCCURRENCE_HISTORY_DAYS = 31
+    OCCURRENCE_HORIZON_DAYS = 400
+
+    # Date range query results kept in memory (entries, least recently used evicted)
+    RANGE_CACHE_SIZE = 64
+    USER_RANGE_CACHE_SIZE = 64
+
+    # Rendered home page day cards kept in memory (total bytes, least recently used evicted)
+    FRAGMENT_CACHE_BYTES = 2 * 1024 * 1024
+
+    # Warm each serving process's caches at startup and this many seconds after every local midnight
+    PREWARM_ENABLED = True
+    PREWARM_DELAY_SECONDS = 5
+
+    # Expand ranges outside the occurrence window with NumPy when it is installed
+    VECTORIZED_EXPANSION = True
+
     # Security (for local network only)
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     PASSWORD = 'your_password_here'  # Simple password for access
 
     # Flask
     DEBUG = True
+
+    # Production server (gunicorn -c gunicorn.conf.py wsgi:app): worker processes
+    # and threads per worker; each worker keeps its own caches and connection pool
+    BIND = os.environ.get('BIND', '0.0.0.0:5000')
+    WORKERS = int(os.environ.get('WORKERS', 2))
+    THREADS = int(os.environ.get('THREADS', 4))
+
+    # Logging: root logger level, and the share of requests traced (0.0 - 1.0)
+    LOG_LEVEL = 'INFO'
+    # Log file ('' for the console only), rotated at 10 MB. Only one process may rotate
+    # it, so with LOG_ROTATE=0 it is instead reopened after an external tool (logrotate)
+    # moves it; gunicorn.conf.py defaults to the console and LOG_ROTATE=0
+    LOG_FILE = os.environ.get('LOG_FILE', 'app.log')
+    LOG_ROTATE = os.environ.get('LOG_ROTATE', '1') != '0'
+    TRACE_ENABLED = True
+    TRACE_SAMPLE_RATE = 1.0
@@ -0,0 +1,133 @@
+"""
+SQLite connection management.
+
+Inside a Flask request every get_db() call shares one connection bound to
+flask.g, released when the app context tears down. Outside a request
+(scripts, background threads) connections come from a small thread-safe
+pool. Either way conn.close() hands the connection back instead of closing
+it, so model functions keep their get_db() ... conn.close() shape.
+"""
+import sqlite3
+import logging
+import threading
+from queue import LifoQueue, Empty, Full
+from flask import g, has_app_context
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Per-thread count of SQL statements run, for query-count reporting
+_statements = threading.local()
+
+def _count_statement(sql):
+    _statements.count = getattr(_statements, 'count', 0) + 1
+
+def statement_count():
+    """Number of SQL statements this thread has run so far"""
+    return getattr(_statements, 'count', 0)
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to its pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.request_bound = False
+
+    def close(self):
+        if self.request_bound:
+            return  # Released at app context teardown
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def really_close(self):
+        super().close()
+
+def apply_pragmas(conn, pragmas=None):
+    """Run the configured PRAGMAs on a new connection"""
+    for name, value in (pragmas if pragmas is not None else Config.SQLITE_PRAGMAS).items():
+        try:
+            conn.execute(f'PRAGMA {name} = {value}')
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"PRAGMA {name} = {value} failed: {e}")
+
+class ConnectionPool:
+    """Thread-safe pool of idle connections to one database file"""
+
+    def __init__(self, database, size):
+        self.database = database
+        self.idle = LifoQueue(maxsize=size)
+
+    def connect(self):
+        conn = sqlite3.connect(self.database, factory=PooledConnection, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        apply_pragmas(conn)
+        conn.set_trace_callback(_count_statement)
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except Empty:
+            return self.connect()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self.idle.put_nowait(conn)
+        except Full:
+            conn.really_close()
+
+    def close_all(self):
+        while True:
+            try:
+                self.idle.get_nowait().really_close()
+            except Empty:
+                return
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(database=None):
+    """Get the pool for a database file (Config.DATABASE by default)"""
+    database = database or Config.DATABASE
+    pool = _pools.get(database)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(database)
+            if pool is None:
+                pool = _pools[database] = ConnectionPool(database, Config.DB_POOL_SIZE)
+    return pool
+
+def close_all_pools():
+    """Close every idle pooled connection"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+
+def get_db():
+    """Get database connection (shared per request, pooled otherwise)"""
+    if has_app_context():
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = get_pool().acquire()
+            conn.request_bound = True
+            g._db_conn = conn
+        return conn
+    return get_pool().acquire()
+
+def release_request_db(exception=None):
+    """Return the request's connection to its pool (teardown_appcontext handler)"""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.request_bound = False
+        conn.close()
+
+def init_app(app):
+    """Release per-request connections when each app context ends"""
+    app.teardown_appcontext(release_request_db)
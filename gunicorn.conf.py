@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for serving wsgi:app.
+
+Workers and threads come from Config (WORKERS / THREADS environment
+variables). Startup tasks run once in the master process before any worker
+is forked; SQLite in WAL mode lets the workers read while one writes. The
+master starts no threads (it logs without the queue listener thread): each
+worker starts its own once it has loaded the app (log listener, cache
+pre-warming, and backups in whichever worker holds the backup lock).
+"""
+import os
+
+# Workers share one log: the console (gunicorn's error log) by default, or a
+# LOG_FILE that logrotate rotates, since no single worker may rotate it
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('LOG_ROTATE', '0')
+
+from config import Config
+
+bind = Config.BIND
+workers = Config.WORKERS
+threads = Config.THREADS
+worker_class = 'gthread'
+
+def on_starting(server):
+    from app import run_startup_tasks
+    run_startup_tasks(forks=True)
+
+def post_worker_init(worker):
+    from app import start_background_threads
+    start_background_threads(worker.wsgi)
@@ -1,26 +1,14 @@
 """
 Migration script to add end_date column to schedules table
-"""
-import sqlite3
-from config import Config
-
-def migrate():
-    conn = sqlite3.connect(Config.DATABASE)
-    cursor = conn.cursor()
 
-    # Check if column already exists
-    cursor.execute("PRAGMA table_info(schedules)")
-    columns = [col[1] for col in cursor.fetchall()]
+This change is now migration 1 in migrations.py; running this script
+applies every pending migration.
+"""
+from migrations import migrate
 
-    if 'end_date' not in columns:
-        print("Adding end_date column to schedules table...")
-        cursor.execute("ALTER TABLE schedules ADD COLUMN end_date TEXT")
-        conn.commit()
+if __name__ == '__main__':
+    applied = migrate()
+    if applied:
         print("Migration completed successfully!")
     else:
-        print("end_date column already exists, no migration needed.")
-
-    conn.close()
-
-if __name__ == '__main__':
-    migrate()
+        print("Database schema is up to date, no migration needed.")
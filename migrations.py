@@ -0,0 +1,112 @@
+"""
+Versioned schema migrations.
+
+The database's PRAGMA user_version records the last migration applied.
+migrate() runs every newer migration in order, each in its own transaction.
+To change the schema, append a migration to MIGRATIONS; never edit or
+reorder one that has already shipped.
+
+Usage: python migrations.py
+"""
+import logging
+import sqlite3
+from db import get_db
+
+logger = logging.getLogger(__name__)
+
+def _add_schedule_end_date(cursor):
+    """Add end_date column to schedules (formerly migrate_add_end_date.py)"""
+    cursor.execute("PRAGMA table_info(schedules)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if 'end_date' not in columns:
+        cursor.execute("ALTER TABLE schedules ADD COLUMN end_date TEXT")
+
+def _add_lookup_indexes(cursor):
+    """Index the columns the hot queries filter and sort on"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedules_task ON schedules (task_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_created_by ON tasks (created_by)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_title ON tasks (title)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_first_name_lower ON users (lower(first_name))')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_assignments_user ON task_assignments (user_id)')
+
+# (version, function) in the order they must run
+MIGRATIONS = [
+    (1, _add_schedule_end_date),
+    (2, _add_lookup_indexes),
+]
+
+# (query, index it must use)
+HOT_QUERIES = [
+    ('SELECT * FROM schedules WHERE task_id = ?', 'idx_schedules_task'),
+    ('DELETE FROM tasks WHERE created_by = ?', 'idx_tasks_created_by'),
+    ('SELECT * FROM tasks ORDER BY title, id', 'idx_tasks_title'),
+    ('SELECT * FROM tasks WHERE (title, id) > (?, ?) ORDER BY title, id LIMIT ?', 'idx_tasks_title'),
+    ('DELETE FROM task_assignments WHERE user_id = ?', 'idx_task_assignments_user'),
+    ('SELECT user_id FROM task_assignments WHERE task_id = ?', 'sqlite_autoindex_task_assignments_1'),
+    ('SELECT * FROM occurrences WHERE date BETWEEN ? AND ?', 'idx_occurrences_date'),
+    ('SELECT COUNT(*) FROM occurrences WHERE date BETWEEN ? AND ?', 'idx_occurrences_date'),
+]
+
+def get_schema_version(cursor):
+    cursor.execute('PRAGMA user_version')
+    return cursor.fetchone()[0]
+
+def migrate():
+    """Apply pending migrations, returning the versions applied"""
+    conn = get_db()
+    cursor = conn.cursor()
+    current = get_schema_version(cursor)
+
+    applied = []
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Applying migration {version}: {migration.__doc__}")
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.close()
+            raise
+        applied.append(version)
+    conn.close()
+
+    if applied:
+        check_query_plans()
+    return applied
+
+def check_query_plans():
+    """Check with EXPLAIN QUERY PLAN that each hot query uses its index.
+
+    Returns a list of (query, index, plan, ok) tuples and logs a warning for
+    every query that doesn't.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    results = []
+    for query, index in HOT_QUERIES:
+        params = (None,) * query.count('?')
+        try:
+            cursor.execute(f'EXPLAIN QUERY PLAN {query}', params)
+            plan = '; '.join(row['detail'] for row in cursor.fetchall())
+        except sqlite3.OperationalError as e:
+            plan = f"error: {e}"
+        ok = index in plan
+        if not ok:
+            logger.warning(f"Query does not use {index}: {query} | Plan: {plan}")
+        results.append((query, index, plan, ok))
+    conn.close()
+    return results
+
+if __name__ == '__main__':
+    applied = migrate()
+    if applied:
+        print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        print("Database schema is up to date, no migration needed.")
+
+    for query, index, plan, ok in check_query_plans():
+        print(f"{'OK  ' if ok else 'MISS'} {query}\n     {plan}")
@@ -1,43 +1,121 @@
-import sqlite3
-import shutil
 import os
 import logging
 import time
-from datetime import datetime, timedelta
-from calendar import monthrange
+import heapq
+import threading
+from collections import deque
+from itertools import islice, dropwhile
+from datetime import date, timedelta
 from config import Config
+from db import get_db
+from migrations import migrate
+from cache import LRUCache
+from tracing import span
+from writer import mutation, submit, after_commit
+from next_due import NextDueIndex
+from schedule_engine import compile_schedule, describe_schedule, CompiledSchedule, get_ordinal, SCHEDULE_FIELDS
+from schedule_vectorized import expand_columnar, as_lists, HAVE_NUMPY
 
 logger = logging.getLogger(__name__)
 
 os.makedirs(os.path.dirname(Config.DATABASE) or '.', exist_ok=True)
 
-def backup_database():
-    """Rotate database backups on startup (bak5 ← bak4 ← bak3 ← bak2 ← bak1 ← database.db)"""
-    start_time = time.time()
-    db_path = Config.DATABASE
-
-    if not os.path.exists(db_path):
-        logger.info("No database to backup yet")
-        return  # No database to backup yet
-
-    # Rotate existing backups (starting from oldest)
-    for i in range(4, 0, -1):
-        old_backup = f"{db_path}.bak{i}"
-        new_backup = f"{db_path}.bak{i+1}"
-        if os.path.exists(old_backup):
-            shutil.copy2(old_backup, new_backup)
-
-    # Create bak1 from current database
-    shutil.copy2(db_path, f"{db_path}.bak1")
-    elapsed = time.time() - start_time
-    logger.info(f"Database backed up: {db_path}.bak1 (took {elapsed:.3f}s)")
-    print(f"Database backed up: {db_path}.bak1")
-
-def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(Config.DATABASE)
-    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-    return conn
+# (start_date, end_date, data version) -> occurrence list
+_range_cache = LRUCache(Config.RANGE_CACHE_SIZE)
+_user_range_cache = LRUCache(Config.USER_RANGE_CACHE_SIZE)
+
+def get_data_version():
+    """Current data version, shared by every process using the database"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM meta WHERE key = 'data_version'")
+    row = cursor.fetchone()
+    conn.close()
+    return int(row['value']) if row else 0
+
+def _bump_meta(cursor, key):
+    """Increment the counter in meta under key (starting it at 1); returns the new value"""
+    cursor.execute("""
+        INSERT INTO meta (key, value) VALUES (?, 1)
+        ON CONFLICT (key) DO UPDATE SET value = value + 1
+        RETURNING value
+    """, (key,))
+    return int(cursor.fetchone()['value'])
+
+def bump_data_version(cursor=None):
+    """Mark all cached query results stale
+
+    Mutating functions pass their cursor so the bump commits together with
+    the change; without one the bump is queued on the writer on its own.
+    """
+    if cursor is None:
+        submit(bump_data_version).result()
+        return
+    _bump_meta(cursor, 'data_version')
+
+# (database, users_version, by_id, by_casefolded_name, ordered by first_name), see _user_directory
+_users = None
+_users_lock = threading.Lock()
+
+def _bump_users_version(cursor):
+    """Mark the user directory stale in every process (call from user mutations)"""
+    _bump_meta(cursor, 'users_version')
+
+def _user_directory(cursor=None):
+    """All users held in memory, reloaded only when the users_version meta key moves
+
+    Returns (by_id, by_name, ordered): users by id, by case-folded first name
+    (the lowest id wins when two names fold alike) and sorted by first name.
+    The rows are shared and read-only.
+    """
+    global _users
+    conn = None
+    if cursor is None:
+        conn = get_db()
+        cursor = conn.cursor()
+    cursor.execute("SELECT value FROM meta WHERE key = 'users_version'")
+    row = cursor.fetchone()
+    version = (Config.DATABASE, int(row['value']) if row else 0)
+
+    users = _users
+    if users is None or users[:2] != version:
+        with _users_lock:
+            users = _users
+            if users is None or users[:2] != version:
+                # Rows read after the version, so a change in between only triggers another reload
+                cursor.execute('SELECT * FROM users ORDER BY id')
+                rows = cursor.fetchall()
+                by_name = {}
+                for user in rows:
+                    by_name.setdefault(user['first_name'].casefold(), user)
+                ordered = tuple(sorted(rows, key=lambda user: user['first_name']))
+                users = _users = version + ({user['id']: user for user in rows}, by_name, ordered)
+    if conn is not None:
+        conn.close()
+    return users[2:]
+
+# Next date each schedule is due, for get_next_due_tasks; version is (database, schedules_version)
+_next_due = NextDueIndex()
+
+def _patch_next_due(cursor, patch):
+    """Record a schedule change: bump schedules_version and, once committed, patch(index) this process's index
+
+    The patch applies only when the index was current just before this
+    change; otherwise it is left stale and the next read rebuilds it.
+    """
+    version = _bump_meta(cursor, 'schedules_version')
+    database = Config.DATABASE
+
+    def apply():
+        with _next_due.lock:
+            if _next_due.version == (database, version - 1):
+                patch(_next_due)
+                _next_due.version = (database, version)
+    after_commit(apply)
+
+def get_range_cache_stats():
+    """Size and hit/miss counters of the date range caches"""
+    return {'all_users': _range_cache.stats(), 'per_user': _user_range_cache.stats()}
 
 def init_db():
     """Initialize the database with tables"""
@@ -121,42 +199,57 @@ def init_db():
         )
     ''')
 
+    # Materialized schedule occurrences over a rolling window (see refresh_occurrence_window)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS occurrences (
+            task_id INTEGER NOT NULL,
+            schedule_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE,
+            FOREIGN KEY (schedule_id) REFERENCES schedules (id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_occurrences_date ON occurrences (date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_occurrences_task ON occurrences (task_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_occurrences_schedule ON occurrences (schedule_id)')
+
+    # Key/value settings maintained by the app
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
     conn.commit()
     conn.close()
+
+    # Bring older databases (and the indexes) up to the current schema version
+    migrate()
     print("Database initialized successfully")
 
-def add_user(first_name, password):
+@mutation
+def add_user(cursor, first_name, password):
     """Add a new user"""
-    conn = get_db()
-    cursor = conn.cursor()
     cursor.execute('INSERT INTO users (first_name, password) VALUES (?, ?)', (first_name, password))
-    conn.commit()
-    conn.close()
+    _bump_users_version(cursor)
+    bump_data_version(cursor)
     print(f"User '{first_name}' added successfully")
 
 def authenticate_user(first_name, password):
-    """Check if user credentials are valid (case-insensitive username and password)"""
-    start = time.time()
-    logger.debug(f"Authenticating user: {first_name}")
-
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM users WHERE LOWER(first_name) = LOWER(?)', (first_name,))
-    user = cursor.fetchone()
-    conn.close()
+    """Check if user credentials are valid (case-insensitive username and password)
 
-    success = user and user['password'].lower() == password.lower()
-    logger.debug(f"Authentication result for {first_name}: {'SUCCESS' if success else 'FAILED'} ({time.time() - start:.3f}s)")
+    Returns the user's row when they are, None otherwise.
+    """
+    with span('authenticate_user') as sp:
+        _, by_name, _ = _user_directory()
+        # A missing name or password (an incomplete form) fails the login like a wrong one
+        user = by_name.get((first_name or '').casefold())
 
-    return success
+        success = user is not None and user['password'].lower() == (password or '').lower()
+        sp.set(success=success)
 
-def get_ordinal(n):
-    """Convert number to ordinal string (1st, 2nd, 3rd, etc.)"""
-    if 10 <= n % 100 <= 20:
-        suffix = 'th'
-    else:
-        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
-    return f"{n}{suffix}"
+    return user if success else None
 
 def normalize_task_title(title):
     """Normalize task title to sentence case, preserving mid-sentence all-caps words"""
@@ -195,51 +288,44 @@ def normalize_task_title(title):
     return ' '.join(result)
 
 def get_all_users():
-    """Get all users"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM users ORDER BY first_name')
-    users = cursor.fetchall()
-    conn.close()
-    return users
+    """Get all users, ordered by first name"""
+    _, _, ordered = _user_directory()
+    return list(ordered)
 
 def get_user_by_id(user_id):
     """Get a user by ID"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-    user = cursor.fetchone()
-    conn.close()
-    return user
+    by_id, _, _ = _user_directory()
+    return by_id.get(user_id)
 
-def update_user_password(user_id, new_password):
+@mutation
+def update_user_password(cursor, user_id, new_password):
     """Update a user's password"""
-    conn = get_db()
-    cursor = conn.cursor()
     cursor.execute('UPDATE users SET password = ? WHERE id = ?', (new_password, user_id))
-    conn.commit()
-    conn.close()
+    _bump_users_version(cursor)
+    bump_data_version(cursor)
 
-def delete_user(user_id):
+@mutation
+def delete_user(cursor, user_id):
     """Delete a user and handle their tasks/assignments.
 
     - Delete tasks created by this user
     - Unassign this user from tasks they're assigned to
     - Delete any tasks that now have no assignments (and aren't for_everyone)
     """
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # Get the user's first_name for matching created_by
+    # Get the user's first_name for matching created_by (from this transaction, not the directory)
     cursor.execute('SELECT first_name FROM users WHERE id = ?', (user_id,))
     user = cursor.fetchone()
     if not user:
-        conn.close()
         return
 
     user_name = user['first_name']
 
     # Delete tasks created by this user
+    cursor.execute('SELECT id FROM tasks WHERE created_by = ?', (user_name,))
+    deleted_task_ids = [row['id'] for row in cursor.fetchall()]
+    cursor.execute('''
+        DELETE FROM occurrences WHERE task_id IN (SELECT id FROM tasks WHERE created_by = ?)
+    ''', (user_name,))
     cursor.execute('DELETE FROM tasks WHERE created_by = ?', (user_name,))
 
     # Remove this user from task_assignments
@@ -257,61 +343,83 @@ def delete_user(user_id):
 
     # Delete orphaned tasks
     for task in orphaned_tasks:
+        cursor.execute('DELETE FROM occurrences WHERE task_id = ?', (task['id'],))
         cursor.execute('DELETE FROM tasks WHERE id = ?', (task['id'],))
 
     # Delete the user
     cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
 
-    conn.commit()
-    conn.close()
+    deleted_task_ids += [task['id'] for task in orphaned_tasks]
+    _patch_next_due(cursor, lambda index: [index.remove_task(task_id) for task_id in deleted_task_ids])
 
+    _bump_users_version(cursor)
+    bump_data_version(cursor)
     return len(orphaned_tasks)
 
-def create_task(title, description, for_everyone, user_ids=None, created_by=None):
+def _write_assignments(cursor, task_id, for_everyone, user_ids, current=None):
+    """Bring a task's assignments to user_ids (none when for_everyone), writing only the difference.
+
+    current is the set of user ids assigned now, read when not given.
+    Returns (added, removed) as sorted lists of user ids.
+    """
+    wanted = set() if for_everyone else {int(user_id) for user_id in user_ids or ()}
+    if current is None:
+        cursor.execute('SELECT user_id FROM task_assignments WHERE task_id = ?', (task_id,))
+        current = {row['user_id'] for row in cursor.fetchall()}
+
+    added = sorted(wanted - current)
+    removed = sorted(current - wanted)
+    if removed:
+        cursor.executemany('DELETE FROM task_assignments WHERE task_id = ? AND user_id = ?',
+                           [(task_id, user_id) for user_id in removed])
+    if added:
+        cursor.executemany('INSERT INTO task_assignments (task_id, user_id) VALUES (?, ?)',
+                           [(task_id, user_id) for user_id in added])
+    return added, removed
+
+@mutation
+def create_task(cursor, title, description, for_everyone, user_ids=None, created_by=None):
     """Create a new task"""
     title = normalize_task_title(title)
-    conn = get_db()
-    cursor = conn.cursor()
     cursor.execute(
         'INSERT INTO tasks (title, description, for_everyone, created_by) VALUES (?, ?, ?, ?)',
         (title, description, for_everyone, created_by)
     )
     task_id = cursor.lastrowid
+    _write_assignments(cursor, task_id, for_everyone, user_ids, current=set())
 
-    if not for_everyone and user_ids:
-        for user_id in user_ids:
-            cursor.execute(
-                'INSERT INTO task_assignments (task_id, user_id) VALUES (?, ?)',
-                (task_id, user_id)
-            )
-
-    conn.commit()
-    conn.close()
+    bump_data_version(cursor)
     return task_id
 
-def update_task(task_id, title, description, for_everyone, user_ids=None):
-    """Update an existing task"""
-    title = normalize_task_title(title)
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        'UPDATE tasks SET title = ?, description = ?, for_everyone = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-        (title, description, for_everyone, task_id)
-    )
+@mutation
+def update_task(cursor, task_id, title, description, for_everyone, user_ids=None):
+    """Update an existing task
 
-    # Remove old assignments
-    cursor.execute('DELETE FROM task_assignments WHERE task_id = ?', (task_id,))
+    Only assignments that were added or removed are written, and nothing is
+    written (or invalidated) when the form is saved unchanged. Returns what
+    changed: {'task': bool, 'added': [user_id, ...], 'removed': [user_id, ...]}.
 
-    # Add new assignments
-    if not for_everyone and user_ids:
-        for user_id in user_ids:
-            cursor.execute(
-                'INSERT INTO task_assignments (task_id, user_id) VALUES (?, ?)',
-                (task_id, user_id)
-            )
+    Materialized occurrences are untouched: titles and assignments are joined
+    in when occurrences are read.
+    """
+    title = normalize_task_title(title)
+    cursor.execute('SELECT title, description, for_everyone FROM tasks WHERE id = ?', (task_id,))
+    task = cursor.fetchone()
+    if task is None:
+        return {'task': False, 'added': [], 'removed': []}
+
+    task_changed = (task['title'], task['description'] or '', bool(task['for_everyone'])) != \
+        (title, description or '', bool(for_everyone))
+    if task_changed:
+        cursor.execute(
+            'UPDATE tasks SET title = ?, description = ?, for_everyone = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+            (title, description, for_everyone, task_id)
+        )
+    added, removed = _write_assignments(cursor, task_id, for_everyone, user_ids)
 
-    conn.commit()
-    conn.close()
+    if task_changed or added or removed:
+        bump_data_version(cursor)
+    return {'task': task_changed, 'added': added, 'removed': removed}
 
 def get_task(task_id):
     """Get a task by ID"""
@@ -331,19 +439,17 @@ def get_task_assignments(task_id):
     conn.close()
     return assignments
 
-def delete_task(task_id):
+@mutation
+def delete_task(cursor, task_id):
     """Delete a task"""
-    conn = get_db()
-    cursor = conn.cursor()
+    cursor.execute('DELETE FROM occurrences WHERE task_id = ?', (task_id,))
     cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-    conn.commit()
-    conn.close()
+    _patch_next_due(cursor, lambda index: index.remove_task(task_id))
+    bump_data_version(cursor)
 
-def add_schedule(task_id, schedule_type, **kwargs):
+@mutation
+def add_schedule(cursor, task_id, schedule_type, **kwargs):
     """Add a schedule to a task"""
-    conn = get_db()
-    cursor = conn.cursor()
-
     fields = ['task_id', 'schedule_type']
     values = [task_id, schedule_type]
 
@@ -361,8 +467,16 @@ def add_schedule(task_id, schedule_type, **kwargs):
     )
 
     schedule_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    cursor.execute('SELECT * FROM schedules WHERE id = ?', (schedule_id,))
+    schedule = compile_schedule(cursor.fetchone())
+
+    # Materialize the new schedule's occurrences inside the current window
+    window = _get_occurrence_window(cursor)
+    if window:
+        _materialize_occurrences(cursor, [schedule], *window)
+
+    _patch_next_due(cursor, lambda index: index.set(schedule))
+    bump_data_version(cursor)
     return schedule_id
 
 def get_schedules(task_id):
@@ -374,289 +488,682 @@ def get_schedules(task_id):
     conn.close()
     return schedules
 
-def delete_schedule(schedule_id):
+@mutation
+def delete_schedule(cursor, schedule_id):
     """Delete a schedule"""
-    conn = get_db()
-    cursor = conn.cursor()
+    schedule_id = int(schedule_id)  # The next-due index is keyed by int ids
+    cursor.execute('DELETE FROM occurrences WHERE schedule_id = ?', (schedule_id,))
     cursor.execute('DELETE FROM schedules WHERE id = ?', (schedule_id,))
-    conn.commit()
-    conn.close()
+    _patch_next_due(cursor, lambda index: index.remove(schedule_id))
+    bump_data_version(cursor)
+
+def _next_id(cursor, table):
+    """First id AUTOINCREMENT would hand out next (call with the write lock held)"""
+    cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,))
+    row = cursor.fetchone()
+    cursor.execute(f'SELECT MAX(id) FROM {table}')
+    return max(row[0] if row else 0, cursor.fetchone()[0] or 0) + 1
+
+@mutation
+def bulk_create(cursor, users, tasks):
+    """Add many users and tasks with executemany in one transaction; returns counts of rows added
+
+    users are (first_name, password) pairs; a name that matches an existing
+    user (ignoring case) is skipped. tasks are dicts with title,
+    description, for_everyone, created_by, assigned_to (first names) and
+    schedules (schedule row dicts without id or task_id). Raises ValueError
+    if a task is assigned to a user that doesn't exist.
+    """
+    _, by_name, _ = _user_directory(cursor)
+    user_ids = {name: user['id'] for name, user in by_name.items()}
+    new_users = {}
+    for first_name, password in users:
+        if first_name.casefold() not in user_ids:
+            new_users.setdefault(first_name.casefold(), (first_name, password))
+    if new_users:
+        cursor.executemany('INSERT INTO users (first_name, password) VALUES (?, ?)', new_users.values())
+        _bump_users_version(cursor)
+        cursor.execute('SELECT id, first_name FROM users ORDER BY id')
+        for row in cursor.fetchall():
+            user_ids.setdefault(row['first_name'].casefold(), row['id'])
+
+    # Ids are assigned here so assignments and schedules can refer to them without a round trip per task
+    task_id = _next_id(cursor, 'tasks')
+    schedule_id = _next_id(cursor, 'schedules')
+    task_rows, assignment_rows, schedules = [], [], []
+    for task in tasks:
+        missing = [name for name in task['assigned_to'] if name.casefold() not in user_ids]
+        if missing:
+            raise ValueError(f"Task {task['title']!r} is assigned to unknown users {', '.join(missing)}")
+        task_rows.append((task_id, task['title'], task['description'], task['for_everyone'], task['created_by']))
+        assignment_rows.extend((task_id, user_ids[name.casefold()]) for name in task['assigned_to'])
+        for schedule in task['schedules']:
+            schedules.append(dict(schedule, id=schedule_id, task_id=task_id))
+            schedule_id += 1
+        task_id += 1
+
+    cursor.executemany(
+        'INSERT INTO tasks (id, title, description, for_everyone, created_by) VALUES (?, ?, ?, ?, ?)',
+        task_rows)
+    cursor.executemany('INSERT INTO task_assignments (task_id, user_id) VALUES (?, ?)', assignment_rows)
+    cursor.executemany(
+        f"INSERT INTO schedules ({', '.join(SCHEDULE_FIELDS)}) VALUES ({_placeholders(SCHEDULE_FIELDS)})",
+        [tuple(s.get(c) for c in SCHEDULE_FIELDS) for s in schedules])
+
+    compiled = [CompiledSchedule(s) for s in schedules]
+    window = _get_occurrence_window(cursor)
+    occurrences = 0
+    if window:
+        occurrences = _materialize_occurrences(cursor, compiled, *window)
+
+    def add_to_next_due(index):
+        for schedule in compiled:
+            index.set(schedule)
+    _patch_next_due(cursor, add_to_next_due)
+
+    bump_data_version(cursor)
+    return {'users': len(new_users), 'tasks': len(task_rows), 'assignments': len(assignment_rows),
+            'schedules': len(schedules), 'occurrences': occurrences}
+
+def get_compiled_schedules(task_id):
+    """Get all schedules for a task, compiled for expansion"""
+    return [compile_schedule(s) for s in get_schedules(task_id)]
 
 def get_schedule_description(schedule):
     """Generate a human-readable description of a schedule"""
-    st = schedule['schedule_type']
-
-    if st == 'interval_days':
-        desc = f"every {schedule['interval']} days"
-        if schedule['end_date']:
-            desc += f" (until {schedule['end_date']})"
-        return desc
-    elif st == 'interval_weeks':
-        desc = f"every {schedule['interval']} weeks"
-        if schedule['end_date']:
-            desc += f" (until {schedule['end_date']})"
-        return desc
-    elif st == 'interval_months':
-        desc = f"every {schedule['interval']} months"
-        if schedule['end_date']:
-            desc += f" (until {schedule['end_date']})"
-        return desc
-    elif st == 'weekly':
-        return f"weekly on {schedule['day_of_week']}"
-    elif st == 'ordinal_monthly':
-        return f"{schedule['ordinal']} {schedule['day_of_week']} of each month"
-    elif st == 'ordinal_bimonthly':
-        return f"{schedule['ordinal']} {schedule['day_of_week']} of {schedule['even_odd_months']} months"
-    elif st == 'monthly_date':
-        return f"monthly on the {get_ordinal(schedule['day_of_month'])}"
-    elif st == 'first_of_month':
-        return "first day of each month"
-    elif st == 'last_of_month':
-        return "last day of each month"
-    elif st == 'first_last_interval_months':
-        return f"{schedule['first_or_last']} day of every {schedule['interval']} months"
-    elif st == 'times_per_month':
-        return f"{schedule['times_count']} times per month"
-    elif st == 'yearly_week':
-        months = ['', 'January', 'February', 'March', 'April', 'May', 'June',
-                  'July', 'August', 'September', 'October', 'November', 'December']
-        return f"yearly in week {schedule['week_of_year']} of {months[schedule['month']]}"
-    elif st == 'yearly_date':
-        months = ['', 'January', 'February', 'March', 'April', 'May', 'June',
-                  'July', 'August', 'September', 'October', 'November', 'December']
-        return f"yearly on {months[schedule['month']]} {schedule['day_of_month']}"
-    elif st == 'seasonal':
-        return f"seasonal ({schedule['season']})"
-    elif st == 'one_time':
-        return f"one time on {schedule['specific_date']}"
-    else:
-        return "unknown schedule"
+    if isinstance(schedule, CompiledSchedule):
+        return schedule.description
+    return describe_schedule(schedule)
+
+def _placeholders(values):
+    return ', '.join('?' * len(values))
+
+def _load_assignment_names(cursor, task_ids=None):
+    """Map task_id -> assigned users' first names, in user id order (one query)
+
+    Limited to task_ids when given. Names come from the user directory.
+    """
+    where, params = '', ()
+    if task_ids is not None:
+        if not task_ids:
+            return {}
+        where, params = f'WHERE ta.task_id IN ({_placeholders(task_ids)})', tuple(task_ids)
+    by_id, _, _ = _user_directory(cursor)
+    cursor.execute(f'''
+        SELECT ta.task_id, ta.user_id
+        FROM task_assignments ta
+        {where}
+        ORDER BY ta.task_id, ta.user_id
+    ''', params)
+    names_by_task = {}
+    for task_id, user_id in cursor.fetchall():
+        names = names_by_task.setdefault(task_id, [])
+        user = by_id.get(user_id)
+        if user is not None:
+            names.append(user['first_name'])
+    return names_by_task
+
+def _assigned_to_label(task_id, for_everyone, names_by_task):
+    """'Everyone', 'Nobody' or the comma-separated names assigned to a task"""
+    if for_everyone:
+        return 'Everyone'
+    if task_id in names_by_task:
+        return ', '.join(names_by_task[task_id])
+    return 'Nobody'
+
+def _load_schedules(cursor, task_ids):
+    """Map task_id -> compiled schedules in id order, for the given tasks only"""
+    schedules = {}
+    if task_ids:
+        cursor.execute(f'''
+            SELECT * FROM schedules WHERE task_id IN ({_placeholders(task_ids)}) ORDER BY task_id, id
+        ''', list(task_ids))
+        for row in cursor.fetchall():
+            schedules.setdefault(row['task_id'], []).append(compile_schedule(row))
+    return schedules
+
+def _load_tasks_bulk(cursor):
+    """Load tasks, their assignment labels and compiled schedules in a fixed number of queries.
+
+    Returns (tasks, assigned_to, schedules) where assigned_to maps
+    task_id -> 'Everyone' / 'Nobody' / comma-separated first names and
+    schedules maps task_id -> list of CompiledSchedule in id order.
+    """
+    cursor.execute('SELECT * FROM tasks ORDER BY title, id')
+    tasks = cursor.fetchall()
+
+    names_by_task = _load_assignment_names(cursor)
+
+    cursor.execute('SELECT * FROM schedules ORDER BY task_id, id')
+    schedules = {}
+    for row in cursor.fetchall():
+        schedules.setdefault(row['task_id'], []).append(compile_schedule(row))
+
+    assigned_to = {}
+    for task in tasks:
+        assigned_to[task['id']] = _assigned_to_label(task['id'], task['for_everyone'], names_by_task)
+
+    return tasks, assigned_to, schedules
+
+def _task_list_entry(task, schedules, assigned_to):
+    return {
+        'id': task['id'],
+        'title': task['title'],
+        'description': task['description'],
+        'schedule_desc': ', '.join([s.description for s in schedules]),
+        'assigned_to': assigned_to
+    }
 
 def get_all_tasks_alphabetical():
     """Get all tasks alphabetically"""
-    start = time.time()
-    logger.debug("get_all_tasks_alphabetical called")
+    with span('get_all_tasks_alphabetical') as sp:
+        conn = get_db()
+        cursor = conn.cursor()
+        tasks, assigned_to, schedules_by_task = _load_tasks_bulk(cursor)
+        conn.close()
 
+        task_list = []
+        for task in tasks:
+            task_list.append(_task_list_entry(task, schedules_by_task.get(task['id'], []),
+                                              assigned_to[task['id']]))
+        sp.set(tasks=len(task_list))
+
+    return task_list
+
+def count_tasks():
+    """Number of tasks"""
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM tasks ORDER BY title')
-    tasks = cursor.fetchall()
-    logger.debug(f"  Fetched {len(tasks)} tasks")
+    cursor.execute('SELECT COUNT(*) FROM tasks')
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
 
-    query_count = 0
-    task_list = []
-    for task in tasks:
-        # Get assignment info
-        if task['for_everyone']:
-            assigned_to = 'Everyone'
+def _task_title(cursor, task_id):
+    cursor.execute('SELECT title FROM tasks WHERE id = ?', (task_id,))
+    row = cursor.fetchone()
+    return row['title'] if row else None
+
+def get_tasks_page_alphabetical(after=None, before=None, per_page=50):
+    """One page of get_all_tasks_alphabetical(), keyset paginated on (title, id)
+
+    after/before is the id of the last task of the previous page or the first
+    task of the next one; with neither, the first page. A cursor task that
+    has since been deleted also gives the first page. Returns
+    (tasks, has_previous, has_next).
+    """
+    with span('get_tasks_page_alphabetical', after=after, before=before) as sp:
+        conn = get_db()
+        cursor = conn.cursor()
+
+        cursor_id = after if after is not None else before
+        title = _task_title(cursor, cursor_id) if cursor_id is not None else None
+        if title is None:
+            cursor.execute('SELECT * FROM tasks ORDER BY title, id LIMIT ?', (per_page + 1,))
+            has_previous = False
+        elif after is not None:
+            cursor.execute('''
+                SELECT * FROM tasks WHERE (title, id) > (?, ?) ORDER BY title, id LIMIT ?
+            ''', (title, after, per_page + 1))
+            has_previous = True
         else:
-            assigned_users = get_task_assignments(task['id'])
-            if assigned_users:
-                # Get user names
-                user_names = []
-                for user_id in assigned_users:
-                    query_count += 1
-                    cursor.execute('SELECT first_name FROM users WHERE id = ?', (user_id,))
-                    user = cursor.fetchone()
-                    if user:
-                        user_names.append(user['first_name'])
-                assigned_to = ', '.join(user_names)
-            else:
-                assigned_to = 'Nobody'
-
-        schedules = get_schedules(task['id'])
-        schedule_desc = ', '.join([get_schedule_description(s) for s in schedules])
-        task_list.append({
-            'id': task['id'],
-            'title': task['title'],
-            'description': task['description'],
-            'schedule_desc': schedule_desc,
-            'assigned_to': assigned_to
-        })
+            cursor.execute('''
+                SELECT * FROM tasks WHERE (title, id) < (?, ?) ORDER BY title DESC, id DESC LIMIT ?
+            ''', (title, before, per_page + 1))
+        tasks = cursor.fetchall()
+
+        if title is not None and after is None:
+            has_previous = len(tasks) > per_page
+            tasks = tasks[:per_page][::-1]
+            has_next = True
+        else:
+            has_next = len(tasks) > per_page
+            tasks = tasks[:per_page]
 
-    conn.close()
-    elapsed = time.time() - start
-    logger.info(f"get_all_tasks_alphabetical completed: {elapsed:.3f}s | Tasks: {len(task_list)} | User queries: {query_count}")
+        # Assignments and schedules for this page only
+        task_ids = [task['id'] for task in tasks]
+        names_by_task = _load_assignment_names(cursor, task_ids)
+        schedules_by_task = _load_schedules(cursor, task_ids)
+        conn.close()
 
-    return task_list
+        task_list = [
+            _task_list_entry(task, schedules_by_task.get(task['id'], []),
+                             _assigned_to_label(task['id'], task['for_everyone'], names_by_task))
+            for task in tasks
+        ]
+        sp.set(tasks=len(task_list))
+
+    return task_list, has_previous, has_next
 
 def calculate_next_occurrence(schedule, from_date):
     """Calculate the next occurrence of a schedule from a given date"""
-    st = schedule['schedule_type']
-
-    if st == 'interval_days':
-        start = datetime.strptime(schedule['start_date'], '%Y-%m-%d').date()
-        days_diff = (from_date - start).days
-        if days_diff < 0:
-            return start
-        interval = schedule['interval']
-        next_occ = start + timedelta(days=((days_diff // interval) + 1) * interval)
-        # Check end_date if specified
-        if schedule['end_date']:
-            end = datetime.strptime(schedule['end_date'], '%Y-%m-%d').date()
-            if next_occ > end:
-                return None
-        return next_occ
-
-    elif st == 'interval_weeks':
-        start = datetime.strptime(schedule['start_date'], '%Y-%m-%d').date()
-        days_diff = (from_date - start).days
-        if days_diff < 0:
-            return start
-        interval = schedule['interval']
-        weeks = (days_diff // 7) // interval + 1
-        next_occ = start + timedelta(weeks=weeks * interval)
-        # Check end_date if specified
-        if schedule['end_date']:
-            end = datetime.strptime(schedule['end_date'], '%Y-%m-%d').date()
-            if next_occ > end:
-                return None
-        return next_occ
-
-    elif st == 'interval_months':
-        start = datetime.strptime(schedule['start_date'], '%Y-%m-%d').date()
-        if from_date < start:
-            return start
-        interval = schedule['interval']
-        months_diff = (from_date.year - start.year) * 12 + from_date.month - start.month
-        next_month_count = (months_diff // interval + 1) * interval
-        next_year = start.year + (start.month + next_month_count - 1) // 12
-        next_month = (start.month + next_month_count - 1) % 12 + 1
-        next_occ = datetime(next_year, next_month, start.day).date()
-        # Check end_date if specified
-        if schedule['end_date']:
-            end = datetime.strptime(schedule['end_date'], '%Y-%m-%d').date()
-            if next_occ > end:
-                return None
-        return next_occ
-
-    elif st == 'weekly':
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        target_day = days.index(schedule['day_of_week'])
-        current_day = from_date.weekday()
-        days_ahead = (target_day - current_day) % 7
-        if days_ahead == 0:
-            days_ahead = 7
-        return from_date + timedelta(days=days_ahead)
-
-    elif st == 'monthly_date':
-        day = schedule['day_of_month']
-        if from_date.day < day:
-            return datetime(from_date.year, from_date.month, day).date()
-        else:
-            next_month = from_date.month + 1
-            next_year = from_date.year
-            if next_month > 12:
-                next_month = 1
-                next_year += 1
-            return datetime(next_year, next_month, day).date()
-
-    elif st == 'first_of_month':
-        if from_date.day == 1:
-            next_month = from_date.month + 1
-            next_year = from_date.year
-            if next_month > 12:
-                next_month = 1
-                next_year += 1
-            return datetime(next_year, next_month, 1).date()
+    return compile_schedule(schedule).next_after(from_date)
+
+def _get_occurrence_window(cursor):
+    """(start, end) dates covered by the occurrences table, or None before it is built"""
+    cursor.execute("SELECT value FROM meta WHERE key = 'occurrence_window'")
+    row = cursor.fetchone()
+    if not row:
+        return None
+    start, end = row['value'].split('/')
+    return date.fromisoformat(start), date.fromisoformat(end)
+
+def _materialize_occurrences(cursor, schedules, start_date, end_date):
+    """Insert occurrence rows for compiled schedules in [start_date, end_date]"""
+    rows = [(s.task_id, s.id, d.isoformat())
+            for s in schedules for d in s.occurrences(start_date, end_date)]
+    cursor.executemany('INSERT INTO occurrences (task_id, schedule_id, date) VALUES (?, ?, ?)', rows)
+    return len(rows)
+
+@mutation
+def refresh_occurrence_window(cursor, today=None):
+    """Roll the materialized occurrence window forward to cover today's horizon.
+
+    Only days entering the window are expanded and only days leaving it are
+    deleted; the table is rebuilt from scratch when there is no usable overlap.
+    """
+    start = time.time()
+    today = today or date.today()
+    want_start = today - timedelta(days=Config.OCCURRENCE_HISTORY_DAYS)
+    want_end = today + timedelta(days=Config.OCCURRENCE_HORIZON_DAYS)
+
+    window = _get_occurrence_window(cursor)
+    if window == (want_start, want_end):
+        return 0
+
+    if window is None or not (window[0] <= want_start <= window[1]):
+        cursor.execute('DELETE FROM occurrences')
+        expand_from = want_start
+    else:
+        cursor.execute('DELETE FROM occurrences WHERE date < ? OR date > ?',
+                       (want_start.isoformat(), want_end.isoformat()))
+        expand_from = window[1] + timedelta(days=1)
+
+    added = 0
+    if expand_from <= want_end:
+        cursor.execute('''
+            SELECT s.* FROM schedules s JOIN tasks t ON t.id = s.task_id
+        ''')
+        schedules = [compile_schedule(row) for row in cursor.fetchall()]
+        with span('materialize', schedules=len(schedules)):
+            added = _materialize_occurrences(cursor, schedules, expand_from, want_end)
+
+    cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('occurrence_window', ?)",
+                   (f"{want_start.isoformat()}/{want_end.isoformat()}",))
+
+    logger.info("Occurrence window refreshed to %s - %s: %d rows added (%.3fs)",
+                want_start, want_end, added, time.time() - start)
+    return added
+
+def _current_occurrence_window(cursor):
+    """The occurrence window, rolled forward first if today's horizon has moved past it"""
+    window = _get_occurrence_window(cursor)
+    if window is None or window[1] < date.today() + timedelta(days=Config.OCCURRENCE_HORIZON_DAYS):
+        refresh_occurrence_window()
+        window = _get_occurrence_window(cursor)
+    return window
+
+def _read_materialized_range(cursor, start_date, end_date, user_id=None):
+    """Occurrences in [start_date, end_date] from the occurrences table (indexed range scan)
+
+    Limited to the tasks user_id sees when given.
+    """
+    user_filter, params = '', [start_date.isoformat(), end_date.isoformat()]
+    if user_id is not None:
+        user_filter = 'AND (t.for_everyone = 1 OR o.task_id IN (SELECT task_id FROM task_assignments WHERE user_id = ?))'
+        params.append(user_id)
+    cursor.execute(f'''
+        SELECT o.date, o.task_id, t.title, t.for_everyone
+        FROM occurrences o
+        JOIN tasks t ON t.id = o.task_id
+        WHERE o.date BETWEEN ? AND ? {user_filter}
+        ORDER BY o.date, t.title, t.id, o.schedule_id
+    ''', params)
+    rows = cursor.fetchall()
+    if user_id is None:
+        names_by_task = _load_assignment_names(cursor)
+    else:
+        names_by_task = _load_assignment_names(cursor, sorted({row['task_id'] for row in rows
+                                                               if not row['for_everyone']}))
+
+    labels = {}
+    occurrences = []
+    for row in rows:
+        task_id = row['task_id']
+        if task_id not in labels:
+            labels[task_id] = _assigned_to_label(task_id, row['for_everyone'], names_by_task)
+        occurrences.append({
+            'date': date.fromisoformat(row['date']),
+            'task_id': task_id,
+            'task_title': row['title'],
+            'assigned_to': labels[task_id]
+        })
+    return occurrences, len(labels)
+
+def _expansion_backend():
+    return 'numpy' if Config.VECTORIZED_EXPANSION and HAVE_NUMPY else 'python'
+
+def _expand_tasks(tasks, assigned_to, schedules_by_task, start_date, end_date):
+    """Occurrence dicts for the given tasks' schedules in [start_date, end_date]"""
+    titles = {task['id']: task['title'] for task in tasks}
+    # Task order (title, id) breaks ties between occurrences on the same date
+    schedules = [schedule for task in tasks for schedule in schedules_by_task.get(task['id'], [])]
+
+    backend = _expansion_backend()
+    with span('expand', schedules=len(schedules), backend=backend):
+        dates, task_ids = as_lists(*expand_columnar(schedules, start_date, end_date, backend))
+        return [{
+            'date': next_occ,
+            'task_id': task_id,
+            'task_title': titles[task_id],
+            'assigned_to': assigned_to[task_id]
+        } for next_occ, task_id in zip(dates, task_ids)]
+
+def _expand_range(cursor, start_date, end_date):
+    """Occurrences in [start_date, end_date] expanded from the schedules"""
+    tasks, assigned_to, schedules_by_task = _load_tasks_bulk(cursor)
+    return _expand_tasks(tasks, assigned_to, schedules_by_task, start_date, end_date), len(tasks)
+
+def _keyed_occurrences(schedule, title, start_date, end_date):
+    for next_occ in schedule.iter_occurrences(start_date, end_date):
+        yield next_occ, title, schedule.task_id, schedule.id
+
+def _merged_keys(tasks, schedules_by_task, start_date, end_date):
+    """(date, title, task_id, schedule_id) of every occurrence, merged lazily into that order"""
+    # One date-ordered stream per schedule; heapq.merge interleaves them
+    return heapq.merge(*[_keyed_occurrences(schedule, task['title'], start_date, end_date)
+                         for task in tasks for schedule in schedules_by_task.get(task['id'], [])])
+
+def _merged_occurrences(tasks, assigned_to, schedules_by_task, start_date, end_date):
+    for next_occ, title, task_id, _ in _merged_keys(tasks, schedules_by_task, start_date, end_date):
+        yield {
+            'date': next_occ,
+            'task_id': task_id,
+            'task_title': title,
+            'assigned_to': assigned_to[task_id]
+        }
+
+def iter_tasks_for_date_range(start_date, end_date):
+    """Iterate task occurrences within a date range in date order without building the whole list
+
+    Yields the same dicts in the same order as get_tasks_for_date_range.
+    Ranges inside the materialized window go through get_tasks_for_date_range
+    and its cache. For wider ones, tasks and schedules are loaded up front;
+    each schedule then expands lazily and heapq.merge interleaves them, so
+    memory stays flat however wide the range is.
+    """
+    cached = _range_cache.get((start_date, end_date, get_data_version()))
+    if cached is not None:
+        return iter(cached)
+
+    with span('iter_tasks_for_date_range', start=start_date, end=end_date):
+        conn = get_db()
+        cursor = conn.cursor()
+        window = _current_occurrence_window(cursor)
+        if window[0] <= start_date and end_date <= window[1]:
+            conn.close()
+            return iter(get_tasks_for_date_range(start_date, end_date))
+        tasks, assigned_to, schedules_by_task = _load_tasks_bulk(cursor)
+        conn.close()
+    return _merged_occurrences(tasks, assigned_to, schedules_by_task, start_date, end_date)
+
+def _materialized_page_keys(cursor, start_date, end_date, key, forward, limit):
+    """Up to limit occurrence keys from the occurrences table, walking away from key"""
+    after_key = ''
+    params = [start_date.isoformat(), end_date.isoformat()]
+    if key is not None:
+        after_key = f"AND (o.date, t.title, t.id, o.schedule_id) {'>' if forward else '<'} (?, ?, ?, ?)"
+        params += [key[0].isoformat(), key[1], key[2], key[3]]
+    direction = '' if forward else ' DESC'
+    cursor.execute(f'''
+        SELECT o.date, t.title, o.task_id, o.schedule_id
+        FROM occurrences o
+        JOIN tasks t ON t.id = o.task_id
+        WHERE o.date BETWEEN ? AND ? {after_key}
+        ORDER BY o.date{direction}, t.title{direction}, t.id{direction}, o.schedule_id{direction}
+        LIMIT ?
+    ''', params + [limit])
+    return [(date.fromisoformat(row['date']), row['title'], row['task_id'], row['schedule_id'])
+            for row in cursor.fetchall()]
+
+def _expanded_page_keys(cursor, start_date, end_date, key, forward, limit):
+    """Up to limit occurrence keys from the merged schedule streams, walking away from key"""
+    tasks, _, schedules_by_task = _load_tasks_bulk(cursor)
+    if forward:
+        resume_from = max(start_date, key[0]) if key is not None else start_date
+        keys = _merged_keys(tasks, schedules_by_task, resume_from, end_date)
+        return list(islice((k for k in keys if key is None or k > key), limit))
+    # Walking backwards: keep the last `limit` keys before the cursor
+    keys = _merged_keys(tasks, schedules_by_task, start_date, min(end_date, key[0]))
+    return list(deque((k for k in keys if k < key), maxlen=limit))[::-1]
+
+def get_occurrences_page(start_date, end_date, after=None, before=None, per_page=50):
+    """One page of get_tasks_for_date_range(start_date, end_date), keyset paginated
+
+    after/before is the (date, task_id, schedule_id) of the last occurrence of
+    the previous page or the first one of the next; the task's title, the
+    rest of the sort key, is looked up here. With neither (or a cursor task
+    that has since been deleted), the first page. Occurrence dicts also carry
+    'schedule_id' for building cursors. Returns
+    (occurrences, has_previous, has_next).
+    """
+    with span('get_occurrences_page', start=start_date, end=end_date) as sp:
+        conn = get_db()
+        cursor = conn.cursor()
+
+        edge = after if after is not None else before
+        title = _task_title(cursor, edge[1]) if edge is not None else None
+        key = (edge[0], title, edge[1], edge[2]) if title is not None else None
+        forward = key is None or after is not None
+
+        window = _current_occurrence_window(cursor)
+        if window[0] <= start_date and end_date <= window[1]:
+            source = 'materialized'
+            keys = _materialized_page_keys(cursor, start_date, end_date, key, forward, per_page + 1)
         else:
-            next_month = from_date.month + 1
-            next_year = from_date.year
-            if next_month > 12:
-                next_month = 1
-                next_year += 1
-            return datetime(next_year, next_month, 1).date()
-
-    elif st == 'last_of_month':
-        _, last_day = monthrange(from_date.year, from_date.month)
-        if from_date.day < last_day:
-            return datetime(from_date.year, from_date.month, last_day).date()
+            source = 'expanded'
+            keys = _expanded_page_keys(cursor, start_date, end_date, key, forward, per_page + 1)
+
+        if forward:
+            has_previous, has_next = key is not None, len(keys) > per_page
+            keys = keys[:per_page]
         else:
-            next_month = from_date.month + 1
-            next_year = from_date.year
-            if next_month > 12:
-                next_month = 1
-                next_year += 1
-            _, last_day = monthrange(next_year, next_month)
-            return datetime(next_year, next_month, last_day).date()
-
-    elif st == 'one_time':
-        specific = datetime.strptime(schedule['specific_date'], '%Y-%m-%d').date()
-        if from_date <= specific:
-            return specific
-        return None
+            has_previous, has_next = len(keys) > per_page, True
+            keys = keys[:per_page][::-1]
+
+        # Assignment labels for this page's tasks only
+        task_ids = sorted({k[2] for k in keys})
+        names_by_task = _load_assignment_names(cursor, task_ids)
+        labels = {}
+        if task_ids:
+            cursor.execute(f'SELECT id, for_everyone FROM tasks WHERE id IN ({_placeholders(task_ids)})',
+                           task_ids)
+            labels = {row['id']: _assigned_to_label(row['id'], row['for_everyone'], names_by_task)
+                      for row in cursor.fetchall()}
+        conn.close()
 
-    return None
+        occurrences = [{
+            'date': next_occ,
+            'task_id': task_id,
+            'task_title': title,
+            'assigned_to': labels[task_id],
+            'schedule_id': schedule_id
+        } for next_occ, title, task_id, schedule_id in keys]
+        sp.set(source=source, occurrences=len(occurrences))
 
-def get_tasks_for_date_range(start_date, end_date):
-    """Get all task occurrences within a date range"""
-    func_start = time.time()
-    logger.debug(f"get_tasks_for_date_range: {start_date} to {end_date}")
+    return occurrences, has_previous, has_next
 
+def count_occurrences(start_date, end_date):
+    """Number of task occurrences within a date range, without building them"""
     conn = get_db()
     cursor = conn.cursor()
+    window = _current_occurrence_window(cursor)
+    if window[0] <= start_date and end_date <= window[1]:
+        cursor.execute('SELECT COUNT(*) FROM occurrences WHERE date BETWEEN ? AND ?',
+                       (start_date.isoformat(), end_date.isoformat()))
+        count = cursor.fetchone()[0]
+    else:
+        tasks, _, schedules_by_task = _load_tasks_bulk(cursor)
+        schedules = [s for task in tasks for s in schedules_by_task.get(task['id'], [])]
+        count = len(expand_columnar(schedules, start_date, end_date, _expansion_backend())[0])
+    conn.close()
+    return count
+
+def get_tasks_for_date_range(start_date, end_date):
+    """Get all task occurrences within a date range
 
-    query_start = time.time()
-    cursor.execute('SELECT * FROM tasks ORDER BY title')
+    Ranges inside the materialized window are read from the occurrences
+    table; anything reaching outside it is expanded from the schedules.
+    Results are cached until the next data change. The occurrence dicts are
+    shared between callers and must not be modified.
+    """
+    with span('get_tasks_for_date_range', start=start_date, end=end_date) as sp:
+        cache_key = (start_date, end_date, get_data_version())
+        cached = _range_cache.get(cache_key)
+        if cached is not None:
+            sp.set(source='cache', occurrences=len(cached))
+            return list(cached)
+
+        conn = get_db()
+        cursor = conn.cursor()
+
+        window = _current_occurrence_window(cursor)
+        if window[0] <= start_date and end_date <= window[1]:
+            source = 'materialized'
+            occurrences, task_count = _read_materialized_range(cursor, start_date, end_date)
+        else:
+            source = 'expanded'
+            occurrences, task_count = _expand_range(cursor, start_date, end_date)
+        conn.close()
+        sp.set(source=source, tasks=task_count, occurrences=len(occurrences))
+
+    _range_cache.set(cache_key, occurrences)
+    return list(occurrences)
+
+def prewarm_range(start_date, end_date):
+    """Put get_tasks_for_date_range(start_date, end_date) in the range cache
+
+    When the same range one day earlier is cached at the current data
+    version, its occurrences from start_date on are kept and only end_date
+    is read, so rolling a window over midnight costs one day. Returns
+    'cached', 'shifted' or 'read'.
+    """
+    version = get_data_version()
+    if _range_cache.get((start_date, end_date, version)) is not None:
+        return 'cached'
+
+    one_day = timedelta(days=1)
+    previous = _range_cache.get((start_date - one_day, end_date - one_day, version))
+    if previous is None:
+        get_tasks_for_date_range(start_date, end_date)
+        return 'read'
+
+    with span('prewarm_range', start=start_date, end=end_date):
+        kept = list(dropwhile(lambda occ: occ['date'] < start_date, previous))
+        _range_cache.set((start_date, end_date, version), kept + get_tasks_for_date_range(end_date, end_date))
+    return 'shifted'
+
+def _load_user_tasks(cursor, user_id):
+    """Like _load_tasks_bulk, for the tasks a user sees: for_everyone ones and their assignments"""
+    cursor.execute('''
+        SELECT * FROM tasks WHERE for_everyone = 1
+        UNION
+        SELECT t.* FROM task_assignments ta JOIN tasks t ON t.id = ta.task_id WHERE ta.user_id = ?
+        ORDER BY title, id
+    ''', (user_id,))
     tasks = cursor.fetchall()
-    logger.debug(f"  Query: Fetched {len(tasks)} tasks ({time.time() - query_start:.3f}s)")
 
-    occurrences = []
-    query_count = 0
+    task_ids = [task['id'] for task in tasks]
+    names_by_task = _load_assignment_names(cursor, [task['id'] for task in tasks if not task['for_everyone']])
+    assigned_to = {task['id']: _assigned_to_label(task['id'], task['for_everyone'], names_by_task)
+                   for task in tasks}
+    return tasks, assigned_to, _load_schedules(cursor, task_ids)
 
-    for idx, task in enumerate(tasks):
-        task_start = time.time()
-        logger.debug(f"  Processing task {idx+1}/{len(tasks)}: {task['title']}")
+def get_tasks_for_user_date_range(user_id, start_date, end_date):
+    """Get the task occurrences a user sees within a date range
 
-        # Get assignment info
-        if task['for_everyone']:
-            assigned_to = 'Everyone'
+    Like get_tasks_for_date_range, but only for_everyone tasks and tasks
+    assigned to user_id (found through idx_task_assignments_user) are read
+    or expanded, so the cost follows the user's own task count. Cached per
+    user until the next data change; the occurrence dicts must not be
+    modified.
+    """
+    with span('get_tasks_for_user_date_range', user_id=user_id, start=start_date, end=end_date) as sp:
+        cache_key = (user_id, start_date, end_date, get_data_version())
+        cached = _user_range_cache.get(cache_key)
+        if cached is not None:
+            sp.set(source='cache', occurrences=len(cached))
+            return list(cached)
+
+        conn = get_db()
+        cursor = conn.cursor()
+        window = _current_occurrence_window(cursor)
+        if window[0] <= start_date and end_date <= window[1]:
+            source = 'materialized'
+            occurrences, task_count = _read_materialized_range(cursor, start_date, end_date, user_id)
         else:
-            assigned_users = get_task_assignments(task['id'])
-            if assigned_users:
-                # Get user names
-                user_names = []
-                for user_id in assigned_users:
-                    query_count += 1
-                    cursor.execute('SELECT first_name FROM users WHERE id = ?', (user_id,))
-                    user = cursor.fetchone()
-                    if user:
-                        user_names.append(user['first_name'])
-                assigned_to = ', '.join(user_names)
-            else:
-                assigned_to = 'Nobody'
-
-        schedules = get_schedules(task['id'])
-        logger.debug(f"    Found {len(schedules)} schedule(s) for task {task['title']}")
-
-        for schedule in schedules:
-            current_date = start_date
-            occurrence_count = 0
-            while current_date <= end_date:
-                next_occ = calculate_next_occurrence(schedule, current_date)
-                if next_occ and next_occ <= end_date:
-                    occurrences.append({
-                        'date': next_occ,
-                        'task_id': task['id'],
-                        'task_title': task['title'],
-                        'assigned_to': assigned_to
-                    })
-                    occurrence_count += 1
-                    current_date = next_occ + timedelta(days=1)
-                else:
-                    break
-            if occurrence_count > 0:
-                logger.debug(f"    Schedule generated {occurrence_count} occurrence(s)")
-
-        logger.debug(f"  Task {task['title']} processed in {time.time() - task_start:.3f}s")
+            source = 'expanded'
+            tasks, assigned_to, schedules_by_task = _load_user_tasks(cursor, user_id)
+            occurrences = _expand_tasks(tasks, assigned_to, schedules_by_task, start_date, end_date)
+            task_count = len(tasks)
+        conn.close()
+        sp.set(source=source, tasks=task_count, occurrences=len(occurrences))
+
+    _user_range_cache.set(cache_key, occurrences)
+    return list(occurrences)
+
+def _current_next_due(cursor, today):
+    """The next-due index, rebuilt if another process changed schedules, advanced to today"""
+    cursor.execute("SELECT value FROM meta WHERE key = 'schedules_version'")
+    row = cursor.fetchone()
+    version = (Config.DATABASE, int(row['value']) if row else 0)
+    with _next_due.lock:
+        if _next_due.version != version:
+            # Schedules read after the version: a change in between is patched in again harmlessly
+            cursor.execute('SELECT s.* FROM schedules s JOIN tasks t ON t.id = s.task_id')
+            with span('build_next_due'):
+                _next_due.build([compile_schedule(row) for row in cursor.fetchall()], today, version)
+        else:
+            _next_due.advance(today)
+    return _next_due
 
-    conn.close()
-    occurrences.sort(key=lambda x: x['date'])
+def get_next_due_tasks(offset=0, limit=None, today=None):
+    """Tasks in the order they next fall due (today or later), from the next-due index
+
+    Each task appears once, on the soonest date any of its schedules is due;
+    tasks with nothing upcoming are left out. Only the returned tasks are
+    looked up. Returns (entries, total) where entries are dicts with date,
+    task_id, task_title and assigned_to, and total counts the tasks that
+    have a next date.
+    """
+    today = today or date.today()
+    with span('get_next_due_tasks', offset=offset, limit=limit) as sp:
+        conn = get_db()
+        cursor = conn.cursor()
+        index = _current_next_due(cursor, today)
+        stop = None if limit is None else offset + limit
+        due = list(islice(index.iter_tasks(), offset, stop))
+        total = index.task_count()
+
+        task_ids = [task_id for _, task_id in due]
+        tasks = {}
+        if task_ids:
+            cursor.execute(f'SELECT id, title, for_everyone FROM tasks WHERE id IN ({_placeholders(task_ids)})',
+                           task_ids)
+            tasks = {task['id']: task for task in cursor.fetchall()}
+        names_by_task = _load_assignment_names(cursor, [task_id for task_id in task_ids
+                                                        if task_id in tasks and not tasks[task_id]['for_everyone']])
+        conn.close()
 
-    elapsed = time.time() - func_start
-    logger.info(f"get_tasks_for_date_range completed: {elapsed:.3f}s | Tasks: {len(tasks)} | User queries: {query_count} | Occurrences: {len(occurrences)}")
+        entries = [{
+            'date': next_date,
+            'task_id': task_id,
+            'task_title': tasks[task_id]['title'],
+            'assigned_to': _assigned_to_label(task_id, tasks[task_id]['for_everyone'], names_by_task),
+        } for next_date, task_id in due if task_id in tasks]
+        sp.set(tasks=len(entries), total=total)
 
-    return occurrences
+    return entries, total
 
 if __name__ == '__main__':
     init_db()
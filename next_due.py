@@ -0,0 +1,122 @@
+"""
+Next-due index: when each schedule is next due, in a min-heap.
+
+Entries are (next_date, task_id, schedule_id), next_date being the first
+occurrence on or after the index's today. The heap is built once from the
+compiled schedules and afterwards changes in O(log n) steps: set() pushes a
+schedule's new entry, remove() and remove_task() forget schedules, and
+advance() re-pushes only the entries that the passing days have made
+overdue. Superseded entries stay in the heap and are skipped when they
+surface (lazy deletion); the heap is rebuilt from the live entries when the
+dead ones start to outnumber them.
+"""
+import heapq
+import threading
+from datetime import timedelta
+
+class NextDueIndex:
+    """Min-heap of (next_date, task_id, schedule_id) over compiled schedules"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.today = None
+        self.version = None  # Owner's marker for the data the index reflects
+        self.schedules = {}  # schedule_id -> CompiledSchedule
+        self.by_task = {}    # task_id -> {schedule_id, ...}
+        self.live = {}       # schedule_id -> its current heap entry
+        self.heap = []
+
+    def build(self, schedules, today, version=None):
+        """Replace the contents with schedules, due from today"""
+        with self.lock:
+            self.today = today
+            self.version = version
+            self.schedules = {}
+            self.by_task = {}
+            self.live = {}
+            for schedule in schedules:
+                self._add(schedule)
+            self.heap = list(self.live.values())
+            heapq.heapify(self.heap)
+
+    def _add(self, schedule):
+        self.schedules[schedule.id] = schedule
+        self.by_task.setdefault(schedule.task_id, set()).add(schedule.id)
+        next_date = schedule.next_after(self.today - timedelta(days=1))
+        if next_date is None:
+            self.live.pop(schedule.id, None)
+            return None
+        entry = self.live[schedule.id] = (next_date, schedule.task_id, schedule.id)
+        return entry
+
+    def set(self, schedule):
+        """Add a schedule or replace its entry after an edit"""
+        with self.lock:
+            entry = self._add(schedule)
+            if entry is not None:
+                heapq.heappush(self.heap, entry)
+            self._compact()
+
+    def remove(self, schedule_id):
+        with self.lock:
+            schedule = self.schedules.pop(schedule_id, None)
+            if schedule is not None:
+                self.by_task.get(schedule.task_id, set()).discard(schedule_id)
+            self.live.pop(schedule_id, None)
+            self._compact()
+
+    def remove_task(self, task_id):
+        with self.lock:
+            for schedule_id in self.by_task.pop(task_id, ()):
+                self.schedules.pop(schedule_id, None)
+                self.live.pop(schedule_id, None)
+            self._compact()
+
+    def advance(self, today):
+        """Move the index to today, re-pushing only the entries now in the past"""
+        with self.lock:
+            if today == self.today:
+                return
+            if today < self.today:
+                # Clock went back: every entry may be wrong, not just the overdue ones
+                self.build(list(self.schedules.values()), today, self.version)
+                return
+            self.today = today
+            heap = self.heap
+            while heap and heap[0][0] < today:
+                entry = heapq.heappop(heap)
+                schedule_id = entry[2]
+                if self.live.get(schedule_id) != entry:
+                    continue  # Superseded or removed
+                entry = self._add(self.schedules[schedule_id])
+                if entry is not None:
+                    heapq.heappush(heap, entry)
+
+    def _compact(self):
+        if len(self.heap) > 2 * len(self.live) + 64:
+            self.heap = list(self.live.values())
+            heapq.heapify(self.heap)
+
+    def iter_due(self):
+        """Live entries in (next_date, task_id, schedule_id) order, from a snapshot"""
+        with self.lock:
+            heap = list(self.heap)
+            live = set(self.live.values())
+        while heap:
+            entry = heapq.heappop(heap)
+            if entry in live:
+                live.discard(entry)  # The same entry can have been pushed twice
+                yield entry
+
+    def iter_tasks(self):
+        """(next_date, task_id) for each task with a next date, soonest first"""
+        seen = set()
+        for next_date, task_id, _ in self.iter_due():
+            if task_id not in seen:
+                seen.add(task_id)
+                yield next_date, task_id
+
+    def task_count(self):
+        """Number of tasks with a next date"""
+        with self.lock:
+            return len({entry[1] for entry in self.live.values()})
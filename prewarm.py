@@ -0,0 +1,60 @@
+"""
+Cache pre-warming at startup and just after each local midnight.
+
+The page caches live in each serving process, and the pages opened first
+(the home page's 7 days, this month's view, the 180-day list) all move with
+today's date, so without this the first visitor after midnight or after a
+restart would build them cold. start_prewarm_thread(warm) calls warm(today)
+right away and then Config.PREWARM_DELAY_SECONDS after every local
+midnight, from a daemon thread of the calling process; start it in every
+process that serves requests.
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def seconds_until_midnight(now=None):
+    """Seconds from now until the next local midnight"""
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+class PrewarmThread(threading.Thread):
+    """Calls warm(today) now and again just after each local midnight until stopped"""
+
+    def __init__(self, warm):
+        super().__init__(name='prewarm', daemon=True)
+        self.warm = warm
+        self.stopped = threading.Event()
+
+    def run(self):
+        while True:
+            today = date.today()
+            start_time = time.time()
+            try:
+                self.warm(today)
+                logger.info("Caches warmed for %s (took %.3fs)", today, time.time() - start_time)
+            except Exception:
+                logger.exception("Cache pre-warming failed")
+            if self.stopped.wait(seconds_until_midnight() + Config.PREWARM_DELAY_SECONDS):
+                return
+
+    def stop(self):
+        self.stopped.set()
+
+_prewarm_thread = None
+
+def start_prewarm_thread(warm):
+    """Start this process's pre-warming thread if it isn't running (and pre-warming is on)"""
+    global _prewarm_thread
+    if not Config.PREWARM_ENABLED:
+        return None
+    # A thread inherited through fork reports not alive, so each worker starts its own
+    if _prewarm_thread is None or not _prewarm_thread.is_alive():
+        _prewarm_thread = PrewarmThread(warm)
+        _prewarm_thread.start()
+    return _prewarm_thread
@@ -0,0 +1,514 @@
+"""
+Schedule expansion engine.
+
+Each schedules row is compiled once into a CompiledSchedule holding parsed
+dates and weekday numbers, with the schedule_type dispatch resolved up front.
+The compiled object produces every occurrence inside a date range in one pass
+(arithmetic steps for intervals and weekdays, month stepping otherwise).
+Month lengths, nth-weekday days, week starts and season starts come from
+per-year lookup tables built once per year (calendar_for).
+
+A schedule's occurrence dates are fixed by the schedule alone: days that
+don't exist in a month (the 31st, February 29th) fall on the month's last
+day, and interval schedules stop after end_date.
+"""
+from datetime import datetime, date, timedelta
+from calendar import monthrange
+from functools import lru_cache
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTHS = ['', 'January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+ORDINALS = ['first', 'second', 'third', 'fourth', 'last']
+
+# First month and day of each season (meteorological seasons)
+SEASON_STARTS = {'Spring': (3, 1), 'Summer': (6, 1), 'Fall': (9, 1), 'Winter': (12, 1)}
+
+SCHEDULE_FIELDS = (
+    'id', 'task_id', 'schedule_type', 'interval', 'start_date', 'end_date',
+    'day_of_week', 'ordinal', 'even_odd_months', 'day_of_month', 'first_or_last',
+    'times_count', 'week_of_year', 'month', 'specific_date', 'season'
+)
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD string from the database"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+
+def get_ordinal(n):
+    """Convert number to ordinal string (1st, 2nd, 3rd, etc.)"""
+    if 10 <= n % 100 <= 20:
+        suffix = 'th'
+    else:
+        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
+
+def _add_months(year, month, count):
+    """Return (year, month) shifted forward by count months"""
+    total = year * 12 + (month - 1) + count
+    return total // 12, total % 12 + 1
+
+class YearCalendar:
+    """Lookup tables for one year, so expansion avoids repeated weekday arithmetic"""
+    __slots__ = ('year', 'month_lengths', 'ordinal_days', 'week_starts', 'season_starts')
+
+    def __init__(self, year):
+        self.year = year
+        # Index 0 unused so tables are indexed by month number
+        self.month_lengths = (0,) + tuple(monthrange(year, m)[1] for m in range(1, 13))
+
+        # ordinal_days[month][weekday] = (first, second, third, fourth, last) day numbers
+        self.ordinal_days = [None]
+        for month in range(1, 13):
+            first_weekday = monthrange(year, month)[0]
+            length = self.month_lengths[month]
+            by_weekday = []
+            for weekday in range(7):
+                first = 1 + (weekday - first_weekday) % 7
+                last = first + (length - first) // 7 * 7
+                by_weekday.append((first, first + 7, first + 14, first + 21, last))
+            self.ordinal_days.append(by_weekday)
+
+        # week_starts[n] = first day of week n of the year, weeks counted from January 1st
+        jan_1 = date(year, 1, 1)
+        self.week_starts = (None,) + tuple(jan_1 + timedelta(weeks=n) for n in range(53))
+
+        self.season_starts = {season: date(year, month, day)
+                              for season, (month, day) in SEASON_STARTS.items()}
+
+@lru_cache(maxsize=64)
+def calendar_for(year):
+    """Cached YearCalendar for a year"""
+    return YearCalendar(year)
+
+def _month_length(year, month):
+    return calendar_for(year).month_lengths[month]
+
+def _clamped(year, month, day):
+    """date(year, month, day), moved back to the month's last day when day is past it"""
+    return date(year, month, min(day, _month_length(year, month)))
+
+def _month_index(d):
+    return d.year * 12 + d.month - 1
+
+# Each schedule_type has a next_after handler (first occurrence strictly after
+# a date) and an occurrences handler (every occurrence in an inclusive range).
+# Occurrence dates depend only on the schedule, never on the range asked for,
+# so any sub-range of an expansion equals the expansion of that sub-range.
+
+def _next_interval(s, from_date, step_days):
+    if from_date < s.start:
+        next_occ = s.start
+    else:
+        next_occ = s.start + timedelta(days=((from_date - s.start).days // step_days + 1) * step_days)
+    if s.end and next_occ > s.end:
+        return None
+    return next_occ
+
+def _next_interval_days(s, from_date):
+    return _next_interval(s, from_date, s.interval)
+
+def _next_interval_weeks(s, from_date):
+    return _next_interval(s, from_date, s.interval * 7)
+
+def _interval_month_occurrence(s, cycle):
+    year, month = _add_months(s.start.year, s.start.month, cycle * s.interval)
+    return _clamped(year, month, s.start.day)
+
+def _next_interval_months(s, from_date):
+    if from_date < s.start:
+        next_occ = s.start
+    else:
+        cycle = (_month_index(from_date) - _month_index(s.start)) // s.interval
+        next_occ = _interval_month_occurrence(s, cycle)
+        if next_occ <= from_date:
+            next_occ = _interval_month_occurrence(s, cycle + 1)
+    if s.end and next_occ > s.end:
+        return None
+    return next_occ
+
+def _next_weekly(s, from_date):
+    return from_date + timedelta(days=(s.weekday - from_date.weekday()) % 7 or 7)
+
+def _next_monthly(from_date, day_for):
+    next_occ = date(from_date.year, from_date.month, day_for(from_date.year, from_date.month))
+    if next_occ <= from_date:
+        year, month = _add_months(from_date.year, from_date.month, 1)
+        next_occ = date(year, month, day_for(year, month))
+    return next_occ
+
+def _monthly_date_day(s):
+    day = s.day_of_month
+    return lambda y, m: min(day, _month_length(y, m))
+
+def _first_day(y, m):
+    return 1
+
+def _last_day(y, m):
+    return _month_length(y, m)
+
+def _next_monthly_date(s, from_date):
+    return _next_monthly(from_date, _monthly_date_day(s))
+
+def _next_first_of_month(s, from_date):
+    return _next_monthly(from_date, _first_day)
+
+def _next_last_of_month(s, from_date):
+    return _next_monthly(from_date, _last_day)
+
+def _next_one_time(s, from_date):
+    if from_date < s.specific:
+        return s.specific
+    return None
+
+def _next_none(s, from_date):
+    return None
+
+def _expand_interval(s, start_date, end_date, step_days):
+    current = s.start
+    if start_date > current:
+        current += timedelta(days=-(-(start_date - current).days // step_days) * step_days)
+    limit = min(end_date, s.end) if s.end else end_date
+    step = timedelta(days=step_days)
+    result = []
+    while current <= limit:
+        result.append(current)
+        current += step
+    return result
+
+def _expand_interval_days(s, start_date, end_date):
+    return _expand_interval(s, start_date, end_date, s.interval)
+
+def _expand_interval_weeks(s, start_date, end_date):
+    return _expand_interval(s, start_date, end_date, s.interval * 7)
+
+def _expand_interval_months(s, start_date, end_date):
+    cycle = max(0, (_month_index(start_date) - _month_index(s.start)) // s.interval)
+    limit = min(end_date, s.end) if s.end else end_date
+    result = []
+    while True:
+        current = _interval_month_occurrence(s, cycle)
+        if current > limit:
+            return result
+        if current >= start_date:
+            result.append(current)
+        cycle += 1
+
+def _expand_weekly(s, start_date, end_date):
+    current = start_date + timedelta(days=(s.weekday - start_date.weekday()) % 7)
+    result = []
+    step = timedelta(days=7)
+    while current <= end_date:
+        result.append(current)
+        current += step
+    return result
+
+def _expand_monthly(start_date, end_date, day_for):
+    """One occurrence per month on day_for(year, month)"""
+    year, month = start_date.year, start_date.month
+    result = []
+    while True:
+        current = date(year, month, day_for(year, month))
+        if current > end_date:
+            return result
+        if current >= start_date:
+            result.append(current)
+        year, month = _add_months(year, month, 1)
+
+def _expand_monthly_date(s, start_date, end_date):
+    return _expand_monthly(start_date, end_date, _monthly_date_day(s))
+
+def _expand_first_of_month(s, start_date, end_date):
+    return _expand_monthly(start_date, end_date, _first_day)
+
+def _expand_last_of_month(s, start_date, end_date):
+    return _expand_monthly(start_date, end_date, _last_day)
+
+def _expand_one_time(s, start_date, end_date):
+    if start_date <= s.specific <= end_date:
+        return [s.specific]
+    return []
+
+def _expand_none(s, start_date, end_date):
+    return []
+
+def _expand_by_month(start_date, end_date, days_for):
+    """Occurrences on days_for(calendar, month) -> day numbers, month by month"""
+    year, month = start_date.year, start_date.month
+    result = []
+    while True:
+        cal = calendar_for(year)
+        for day in days_for(cal, month):
+            current = date(year, month, day)
+            if current > end_date:
+                return result
+            if current >= start_date:
+                result.append(current)
+        if (year, month) >= (end_date.year, end_date.month):
+            return result
+        year, month = _add_months(year, month, 1)
+
+def _expand_by_year(start_date, end_date, date_for):
+    """Occurrences on date_for(calendar) (or None), year by year"""
+    result = []
+    for year in range(start_date.year, end_date.year + 1):
+        current = date_for(calendar_for(year))
+        if current is not None and start_date <= current <= end_date:
+            result.append(current)
+    return result
+
+def _expand_ordinal_monthly(s, start_date, end_date):
+    return _expand_by_month(start_date, end_date,
+                            lambda cal, m: (cal.ordinal_days[m][s.weekday][s.ordinal_index],))
+
+def _expand_ordinal_bimonthly(s, start_date, end_date):
+    parity = s.month_parity
+    return _expand_by_month(start_date, end_date,
+                            lambda cal, m: (cal.ordinal_days[m][s.weekday][s.ordinal_index],)
+                            if m % 2 == parity else ())
+
+def _expand_first_last_interval_months(s, start_date, end_date):
+    cycle = max(0, (_month_index(start_date) - _month_index(s.start)) // s.interval)
+    limit = min(end_date, s.end) if s.end else end_date
+    result = []
+    while True:
+        year, month = _add_months(s.start.year, s.start.month, cycle * s.interval)
+        current = date(year, month, 1 if s.first_or_last == 'first' else _month_length(year, month))
+        if current > limit:
+            return result
+        if current >= start_date and current >= s.start:
+            result.append(current)
+        cycle += 1
+
+def _expand_times_per_month(s, start_date, end_date):
+    count = s.times_count
+    # Spread evenly from the 1st: twice a month is the 1st and the 15th/16th
+    return _expand_by_month(start_date, end_date,
+                            lambda cal, m: sorted({1 + i * cal.month_lengths[m] // count
+                                                   for i in range(count)}))
+
+def _expand_yearly_week(s, start_date, end_date):
+    def date_for(cal):
+        week_start = cal.week_starts[min(s.week_of_year, 53)]
+        week_end = week_start + timedelta(days=6)
+        # The week's first day inside the chosen month, e.g. week 9 of March -> March 1st
+        if s.month and week_start.month != s.month and week_end.month == s.month:
+            return date(cal.year, s.month, 1)
+        return week_start
+    return _expand_by_year(start_date, end_date, date_for)
+
+def _expand_yearly_date(s, start_date, end_date):
+    return _expand_by_year(start_date, end_date,
+                           lambda cal: date(cal.year, s.month, min(s.day_of_month, cal.month_lengths[s.month])))
+
+def _expand_seasonal(s, start_date, end_date):
+    return _expand_by_year(start_date, end_date, lambda cal: cal.season_starts[s.season])
+
+# Days expanded per step by CompiledSchedule.iter_occurrences
+STREAM_CHUNK_DAYS = 366
+
+# How far _next_by_expansion looks ahead, one year at a time
+NEXT_SEARCH_YEARS = 50
+
+def _next_by_expansion(s, from_date):
+    """First occurrence after from_date, found by expanding a year at a time"""
+    window_start = from_date + timedelta(days=1)
+    for _ in range(NEXT_SEARCH_YEARS):
+        window_end = window_start + timedelta(days=365)
+        dates = s._occurrences(s, window_start, window_end)
+        if dates:
+            return dates[0]
+        if s.schedule_type in INTERVAL_TYPES and s.end and window_end >= s.end:
+            return None
+        window_start = window_end + timedelta(days=1)
+    return None
+
+NO_OCCURRENCES = (_next_none, _expand_none)
+
+# schedule_type -> (next_after, occurrences)
+HANDLERS = {
+    'interval_days': (_next_interval_days, _expand_interval_days),
+    'interval_weeks': (_next_interval_weeks, _expand_interval_weeks),
+    'interval_months': (_next_interval_months, _expand_interval_months),
+    'weekly': (_next_weekly, _expand_weekly),
+    'monthly_date': (_next_monthly_date, _expand_monthly_date),
+    'first_of_month': (_next_first_of_month, _expand_first_of_month),
+    'last_of_month': (_next_last_of_month, _expand_last_of_month),
+    'one_time': (_next_one_time, _expand_one_time),
+    'ordinal_monthly': (_next_by_expansion, _expand_ordinal_monthly),
+    'ordinal_bimonthly': (_next_by_expansion, _expand_ordinal_bimonthly),
+    'first_last_interval_months': (_next_by_expansion, _expand_first_last_interval_months),
+    'times_per_month': (_next_by_expansion, _expand_times_per_month),
+    'yearly_week': (_next_by_expansion, _expand_yearly_week),
+    'yearly_date': (_next_by_expansion, _expand_yearly_date),
+    'seasonal': (_next_by_expansion, _expand_seasonal),
+}
+
+INTERVAL_TYPES = ('interval_days', 'interval_weeks', 'interval_months', 'first_last_interval_months')
+
+# Fields each schedule_type can't expand without
+REQUIRED_FIELDS = {
+    'weekly': ('weekday',),
+    'ordinal_monthly': ('weekday', 'ordinal_index'),
+    'ordinal_bimonthly': ('weekday', 'ordinal_index', 'month_parity'),
+    'monthly_date': ('day_of_month',),
+    'times_per_month': ('times_count',),
+    'yearly_week': ('week_of_year',),
+    'yearly_date': ('month', 'day_of_month'),
+    'seasonal': ('season',),
+    'one_time': ('specific',),
+}
+
+def describe_schedule(schedule):
+    """Generate a human-readable description of a schedule"""
+    st = schedule['schedule_type']
+
+    if st == 'interval_days':
+        desc = f"every {schedule['interval']} days"
+        if schedule['end_date']:
+            desc += f" (until {schedule['end_date']})"
+        return desc
+    elif st == 'interval_weeks':
+        desc = f"every {schedule['interval']} weeks"
+        if schedule['end_date']:
+            desc += f" (until {schedule['end_date']})"
+        return desc
+    elif st == 'interval_months':
+        desc = f"every {schedule['interval']} months"
+        if schedule['end_date']:
+            desc += f" (until {schedule['end_date']})"
+        return desc
+    elif st == 'weekly':
+        return f"weekly on {schedule['day_of_week']}"
+    elif st == 'ordinal_monthly':
+        return f"{schedule['ordinal']} {schedule['day_of_week']} of each month"
+    elif st == 'ordinal_bimonthly':
+        return f"{schedule['ordinal']} {schedule['day_of_week']} of {schedule['even_odd_months']} months"
+    elif st == 'monthly_date':
+        return f"monthly on the {get_ordinal(schedule['day_of_month'])}"
+    elif st == 'first_of_month':
+        return "first day of each month"
+    elif st == 'last_of_month':
+        return "last day of each month"
+    elif st == 'first_last_interval_months':
+        return f"{schedule['first_or_last']} day of every {schedule['interval']} months"
+    elif st == 'times_per_month':
+        return f"{schedule['times_count']} times per month"
+    elif st == 'yearly_week':
+        return f"yearly in week {schedule['week_of_year']} of {MONTHS[schedule['month']]}"
+    elif st == 'yearly_date':
+        return f"yearly on {MONTHS[schedule['month']]} {schedule['day_of_month']}"
+    elif st == 'seasonal':
+        return f"seasonal ({schedule['season']})"
+    elif st == 'one_time':
+        return f"one time on {schedule['specific_date']}"
+    else:
+        return "unknown schedule"
+
+# Descriptions depend only on a schedule's settings, so identical settings share one string
+DESCRIPTION_FIELDS = tuple(f for f in SCHEDULE_FIELDS if f not in ('id', 'task_id', 'start_date'))
+_description_cache = {}
+
+def _parse_optional(value):
+    return parse_date(value) if value else None
+
+class CompiledSchedule:
+    """A schedules row with its fields parsed and its type dispatch resolved once.
+
+    Supports schedule['field'] lookups so it can be passed anywhere a
+    sqlite3.Row schedule is accepted.
+    """
+    __slots__ = SCHEDULE_FIELDS + ('start', 'end', 'specific', 'weekday', 'ordinal_index', 'month_parity',
+                                   '_next_after', '_occurrences', '_description')
+
+    def __init__(self, row):
+        keys = set(row.keys())
+        for field in SCHEDULE_FIELDS:
+            setattr(self, field, row[field] if field in keys else None)
+
+        self.start = _parse_optional(self.start_date)
+        self.end = _parse_optional(self.end_date)
+        self.specific = _parse_optional(self.specific_date)
+        self.weekday = DAYS.index(self.day_of_week) if self.day_of_week in DAYS else None
+        self.ordinal_index = ORDINALS.index(self.ordinal) if self.ordinal in ORDINALS else None
+        self.month_parity = {'even': 0, 'odd': 1}.get(self.even_odd_months)
+
+        handlers = HANDLERS.get(self.schedule_type, NO_OCCURRENCES)
+        if not self._expandable():
+            handlers = NO_OCCURRENCES
+        self._next_after, self._occurrences = handlers
+        self._description = None
+
+    def _expandable(self):
+        """Whether the fields this schedule_type needs are present and in range"""
+        schedule_type = self.schedule_type
+        if schedule_type in INTERVAL_TYPES:
+            return bool(self.start and self.interval and self.interval > 0)
+        if any(getattr(self, field) is None for field in REQUIRED_FIELDS.get(schedule_type, ())):
+            return False
+        if schedule_type in ('monthly_date', 'yearly_date') and self.day_of_month < 1:
+            return False
+        if schedule_type == 'yearly_date' and not 1 <= self.month <= 12:
+            return False
+        if schedule_type == 'times_per_month':
+            return self.times_count >= 1
+        if schedule_type == 'yearly_week':
+            return self.week_of_year >= 1 and (not self.month or 1 <= self.month <= 12)
+        if schedule_type == 'seasonal':
+            return self.season in SEASON_STARTS
+        return True
+
+    def iter_occurrences(self, start_date, end_date):
+        """Occurrences in [start_date, end_date] in date order, expanded lazily STREAM_CHUNK_DAYS at a time"""
+        if not self.has_occurrences:
+            return
+        step = timedelta(days=STREAM_CHUNK_DAYS)
+        while start_date <= end_date:
+            chunk_end = min(end_date, start_date + step)
+            yield from self.occurrences(start_date, chunk_end)
+            if chunk_end == end_date:
+                return
+            start_date = chunk_end + timedelta(days=1)
+
+    @property
+    def has_occurrences(self):
+        """False when the schedule can never produce an occurrence (unknown type, missing fields)"""
+        return self._occurrences is not _expand_none
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def keys(self):
+        return SCHEDULE_FIELDS
+
+    def next_after(self, from_date):
+        """First occurrence strictly after from_date, or None"""
+        return self._next_after(self, from_date)
+
+    def occurrences(self, start_date, end_date):
+        """Every occurrence in [start_date, end_date] (inclusive), in date order"""
+        if start_date > end_date:
+            return []
+        return self._occurrences(self, start_date, end_date)
+
+    @property
+    def description(self):
+        if self._description is None:
+            key = tuple(getattr(self, field) for field in DESCRIPTION_FIELDS)
+            description = _description_cache.get(key)
+            if description is None:
+                description = _description_cache[key] = describe_schedule(self)
+            self._description = description
+        return self._description
+
+def compile_schedule(schedule):
+    """Compile a schedules row, passing already compiled schedules through"""
+    if isinstance(schedule, CompiledSchedule):
+        return schedule
+    return CompiledSchedule(schedule)
+
+def expand_schedule(schedule, start_date, end_date):
+    """Return every occurrence of a schedule in [start_date, end_date], in date order"""
+    return compile_schedule(schedule).occurrences(start_date, end_date)
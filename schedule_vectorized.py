@@ -0,0 +1,221 @@
+"""
+Vectorized bulk schedule expansion.
+
+expand_columnar() expands many compiled schedules over one date range and
+returns the occurrences as two columns, dates and task_ids, ordered by date
+and then by the schedules' order in the input. With NumPy installed,
+schedules are grouped by schedule_type and each group is computed as whole
+day-number arrays: arange-style steps for intervals and weekdays, and a
+month grid (month starts, lengths and first weekdays) for the calendar
+rules, with range and end_date cutoffs applied as masks. Without NumPy the
+same columns are built from CompiledSchedule.occurrences(); both backends
+return the same dates in the same order.
+"""
+from datetime import date
+from schedule_engine import SEASON_STARTS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVE_NUMPY = np is not None
+
+# Day numbers count days since 1970-01-01, which was a Thursday
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+EPOCH_WEEKDAY = 3
+
+def _day_number(d):
+    return d.toordinal() - EPOCH_ORDINAL
+
+def _month_number(d):
+    """Months since January 1970"""
+    return (d.year - 1970) * 12 + d.month - 1
+
+def expand_columnar(schedules, start_date, end_date, backend=None):
+    """Expand compiled schedules over [start_date, end_date] into (dates, task_ids).
+
+    backend is 'numpy', 'python' or None for NumPy when it is installed. The
+    numpy backend returns a datetime64[D] array and an int64 array, the
+    python backend two lists; as_lists() turns either into plain lists.
+    """
+    if backend is None:
+        backend = 'numpy' if HAVE_NUMPY else 'python'
+    if backend == 'numpy':
+        if not HAVE_NUMPY:
+            raise RuntimeError('NumPy is not installed')
+        return _expand_numpy(schedules, start_date, end_date)
+    return _expand_python(schedules, start_date, end_date)
+
+def as_lists(dates, task_ids):
+    """Columns from either backend as lists of datetime.date and int"""
+    if HAVE_NUMPY and isinstance(dates, np.ndarray):
+        return dates.tolist(), task_ids.tolist()
+    return list(dates), list(task_ids)
+
+def _expand_python(schedules, start_date, end_date):
+    keyed = []
+    for position, schedule in enumerate(schedules):
+        for occurrence in schedule.occurrences(start_date, end_date):
+            keyed.append((occurrence, position, schedule.task_id))
+    keyed.sort()
+    return [k[0] for k in keyed], [k[2] for k in keyed]
+
+class _MonthGrid:
+    """Per-month columns for every month touching the range"""
+
+    def __init__(self, start_date, end_date):
+        self.months = np.arange(_month_number(start_date), _month_number(end_date) + 1)
+        starts = self.months.astype('datetime64[M]').astype('datetime64[D]')
+        self.start_days = starts.astype(np.int64)
+        self.lengths = (self.months + 1).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) - self.start_days
+        self.month_of_year = self.months % 12 + 1
+        self.first_weekdays = (self.start_days + EPOCH_WEEKDAY) % 7
+
+def _column(schedules, getter, dtype=np.int64 if np else None):
+    return np.array([getter(s) for s in schedules], dtype=dtype)
+
+def _steps(positions, first, step, low, high):
+    """Occurrences at first + k*step (k >= 0) within [low, high], per schedule"""
+    k_first = np.maximum(0, -((first - low) // step))
+    k_last = (high - first) // step
+    counts = np.maximum(0, k_last - k_first + 1)
+    rows = np.repeat(np.arange(len(first)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    days = first[rows] + (k_first[rows] + offsets) * step[rows]
+    return positions[rows], days
+
+def _masked(positions, days, valid, low, high):
+    """Keep the grid cells that are occurrences and fall within each schedule's [low, high]"""
+    valid = valid & (days >= low[:, None]) & (days <= high[:, None])
+    rows, cols = np.nonzero(valid)
+    return positions[rows], days[rows, cols]
+
+def _interval_limits(group, low, high):
+    starts = _column(group, lambda s: _day_number(s.start))
+    ends = _column(group, lambda s: _day_number(s.end) if s.end else high)
+    return starts, np.maximum(starts, low), np.minimum(ends, high)
+
+def _expand_group(schedule_type, group, positions, grid, low, high):
+    """(positions, day numbers) for a group of schedules sharing schedule_type"""
+    lows = np.full(len(group), low, dtype=np.int64)
+    highs = np.full(len(group), high, dtype=np.int64)
+    start_days = grid.start_days[None, :]
+    lengths = grid.lengths[None, :]
+    every_month = np.ones((len(group), len(grid.months)), dtype=bool)
+
+    if schedule_type in ('interval_days', 'interval_weeks'):
+        weeks = 7 if schedule_type == 'interval_weeks' else 1
+        first, _, limit = _interval_limits(group, low, high)
+        step = _column(group, lambda s: s.interval * weeks)
+        return _steps(positions, first, step, lows, limit)
+
+    if schedule_type == 'weekly':
+        weekdays = _column(group, lambda s: s.weekday)
+        first = low + (weekdays - (low + EPOCH_WEEKDAY)) % 7
+        return _steps(positions, first, np.full(len(group), 7, dtype=np.int64), lows, highs)
+
+    if schedule_type == 'one_time':
+        days = _column(group, lambda s: _day_number(s.specific))
+        keep = (days >= low) & (days <= high)
+        return positions[keep], days[keep]
+
+    if schedule_type in ('interval_months', 'first_last_interval_months'):
+        _, from_day, limit = _interval_limits(group, low, high)
+        start_months = _column(group, lambda s: _month_number(s.start))
+        intervals = _column(group, lambda s: s.interval)
+        offset = grid.months[None, :] - start_months[:, None]
+        valid = (offset >= 0) & (offset % intervals[:, None] == 0)
+        if schedule_type == 'interval_months':
+            day = np.minimum(_column(group, lambda s: s.start.day)[:, None], lengths)
+        else:
+            last = _column(group, lambda s: s.first_or_last != 'first', dtype=bool)[:, None]
+            day = np.where(last, lengths, 1)
+        return _masked(positions, start_days + day - 1, valid, from_day, limit)
+
+    if schedule_type in ('monthly_date', 'first_of_month', 'last_of_month'):
+        if schedule_type == 'monthly_date':
+            day = np.minimum(_column(group, lambda s: s.day_of_month)[:, None], lengths)
+        elif schedule_type == 'first_of_month':
+            day = np.ones_like(every_month, dtype=np.int64)
+        else:
+            day = np.broadcast_to(lengths, every_month.shape)
+        return _masked(positions, start_days + day - 1, every_month, lows, highs)
+
+    if schedule_type in ('ordinal_monthly', 'ordinal_bimonthly'):
+        weekdays = _column(group, lambda s: s.weekday)[:, None]
+        ordinals = _column(group, lambda s: s.ordinal_index)[:, None]
+        first = 1 + (weekdays - grid.first_weekdays[None, :]) % 7
+        last = first + (lengths - first) // 7 * 7
+        day = np.where(ordinals == 4, last, first + 7 * ordinals)
+        valid = every_month
+        if schedule_type == 'ordinal_bimonthly':
+            parity = _column(group, lambda s: s.month_parity)[:, None]
+            valid = grid.month_of_year[None, :] % 2 == parity
+        return _masked(positions, start_days + day - 1, valid, lows, highs)
+
+    if schedule_type == 'times_per_month':
+        counts = _column(group, lambda s: s.times_count)
+        i = np.arange(counts.max())
+        # days[g, m, i] = 1 + i * length // count, dropping repeats when count > length
+        day = 1 + i[None, None, :] * grid.lengths[None, :, None] // counts[:, None, None]
+        valid = np.broadcast_to(i[None, None, :] < counts[:, None, None], day.shape).copy()
+        valid[:, :, 1:] &= day[:, :, 1:] != day[:, :, :-1]
+        days = (grid.start_days[None, :, None] + day - 1).reshape(len(group), -1)
+        return _masked(positions, days, valid.reshape(len(group), -1), lows, highs)
+
+    if schedule_type in ('yearly_date', 'seasonal'):
+        if schedule_type == 'yearly_date':
+            months = _column(group, lambda s: s.month)[:, None]
+            day = np.minimum(_column(group, lambda s: s.day_of_month)[:, None], lengths)
+        else:
+            months = _column(group, lambda s: SEASON_STARTS[s.season][0])[:, None]
+            day = _column(group, lambda s: SEASON_STARTS[s.season][1])[:, None]
+        valid = grid.month_of_year[None, :] == months
+        return _masked(positions, start_days + day - 1, valid & every_month, lows, highs)
+
+    if schedule_type == 'yearly_week':
+        years = np.arange(grid.months[0] // 12, grid.months[-1] // 12 + 1)
+        jan_1 = (years * 12).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)[None, :]
+        weeks = _column(group, lambda s: min(s.week_of_year, 53))[:, None]
+        months = _column(group, lambda s: s.month or 0)[:, None]
+        week_start = jan_1 + 7 * (weeks - 1)
+
+        def month_of(days):
+            return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) % 12 + 1
+
+        month_first = ((years[None, :] * 12 + months - 1).astype('datetime64[M]')
+                       .astype('datetime64[D]').astype(np.int64))
+        into_month = (month_of(week_start) != months) & (month_of(week_start + 6) == months)
+        days = np.where(into_month, month_first, week_start)
+        return _masked(positions, days, np.ones_like(days, dtype=bool), lows, highs)
+
+    raise ValueError(f"No vectorized expansion for schedule_type {schedule_type!r}")
+
+def _expand_numpy(schedules, start_date, end_date):
+    empty = (np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int64))
+    if start_date > end_date:
+        return empty
+
+    groups = {}
+    for position, schedule in enumerate(schedules):
+        if schedule.has_occurrences:
+            groups.setdefault(schedule.schedule_type, []).append(position)
+    if not groups:
+        return empty
+
+    grid = _MonthGrid(start_date, end_date)
+    low, high = _day_number(start_date), _day_number(end_date)
+    position_parts, day_parts = [], []
+    for schedule_type, group_positions in groups.items():
+        group = [schedules[p] for p in group_positions]
+        positions, days = _expand_group(schedule_type, group, np.array(group_positions, dtype=np.int64),
+                                        grid, low, high)
+        position_parts.append(positions)
+        day_parts.append(days)
+
+    positions = np.concatenate(position_parts)
+    days = np.concatenate(day_parts)
+    order = np.lexsort((positions, days))
+    task_ids = np.array([s.task_id for s in schedules], dtype=np.int64)
+    return days[order].astype('datetime64[D]'), task_ids[positions[order]]
@@ -0,0 +1,150 @@
+"""
+Low-overhead request tracing.
+
+A trace is started for a sampled fraction of requests. Code marks the work it
+does with `with span('name', key=value):`; each span records its duration and
+the number of SQL statements run inside it. When the request ends the whole
+trace goes out as one log record on the 'trace' logger, formatted only when a
+handler writes it.
+
+With no active trace (tracing off, request not sampled, or a script) span()
+returns a shared do-nothing object, so instrumentation in hot paths costs one
+context variable lookup.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler
+from flask import request, session, g
+from config import Config
+from db import statement_count
+
+trace_logger = logging.getLogger('trace')
+
+_current_trace = ContextVar('current_trace', default=None)
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    """One timed step of a trace"""
+    __slots__ = ('trace', 'name', 'attrs', 'depth', 'start', 'duration', 'statements')
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.depth = 0
+        self.duration = None
+
+    def __enter__(self):
+        trace = self.trace
+        self.depth = trace.depth
+        trace.depth += 1
+        trace.spans.append(self)
+        self.statements = statement_count()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        self.statements = statement_count() - self.statements
+        self.trace.depth -= 1
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __str__(self):
+        parts = ['>' * self.depth + self.name]
+        if self.duration is not None:
+            parts.append(f"{self.duration * 1000:.1f}ms")
+            parts.append(f"sql={self.statements}")
+        parts.extend(f"{k}={v}" for k, v in self.attrs.items())
+        return ' '.join(parts)
+
+class Trace:
+    """All spans recorded for one request"""
+    __slots__ = ('root', 'spans', 'depth')
+
+    def __init__(self, name, attrs):
+        self.spans = []
+        self.depth = 0
+        self.root = Span(self, name, attrs)
+
+    def __str__(self):
+        return ' | '.join(str(s) for s in self.spans)
+
+def start_trace(name, **attrs):
+    """Start a trace for the current context if it is sampled; returns it or None"""
+    if not Config.TRACE_ENABLED or random.random() >= Config.TRACE_SAMPLE_RATE:
+        return None
+    trace = Trace(name, attrs)
+    trace.root.__enter__()
+    _current_trace.set(trace)
+    return trace
+
+def finish_trace(trace, **attrs):
+    """Close the trace's root span and log it"""
+    _current_trace.set(None)
+    if trace is None:
+        return
+    trace.root.set(**attrs)
+    trace.root.__exit__(None, None, None)
+    trace_logger.info('%s', trace)
+
+def span(name, **attrs):
+    """Context manager timing one step of the current trace (no-op when untraced)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name, attrs)
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler formats each record before queueing it, which puts the
+    formatting cost back on the request thread.
+    """
+
+    def prepare(self, record):
+        return record
+
+def _before_request():
+    g._trace = start_trace(request.endpoint or request.path, method=request.method,
+                           user=session.get('first_name', 'anonymous'))
+
+def _after_request(response):
+    trace = g.pop('_trace', None)
+    finish_trace(trace, status=response.status_code)
+    return response
+
+def _teardown_request(exception=None):
+    # Reached with a trace still open only when the view raised. A streamed
+    # response closed early by the client ends with GeneratorExit, not a failure.
+    trace = g.pop('_trace', None)
+    if exception is not None and not isinstance(exception, GeneratorExit):
+        logging.getLogger(__name__).error(
+            '!!! REQUEST FAILED: %s | Error: %s', request.endpoint, exception)
+    if trace is not None:
+        finish_trace(trace, status=500)
+
+def init_app(app):
+    """Trace every request"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,192 @@
+"""
+Single-writer queue for database mutations.
+
+Model functions that change data run on one writer thread per process (and
+database file) instead of each committing on the caller's connection, so
+concurrent requests queue in memory rather than contending for SQLite's
+write lock. Each time the writer is free it takes every mutation queued
+while it was busy, plus any arriving within Config.WRITE_BATCH_WINDOW
+seconds (at most Config.WRITE_BATCH_MAX), runs each in its own savepoint of
+a single BEGIN IMMEDIATE transaction and commits them together: one commit,
+and one sync, per batch (group commit). Batches grow with load without
+making a lone write wait.
+
+Callers wait on a Future that resolves once their batch has committed. A
+mutation that raises is rolled back to its savepoint alone and its caller
+gets the exception; the rest of the batch still commits.
+
+A function decorated with @mutation takes the writer's cursor as its first
+argument and must not commit; callers call it without the cursor. In-memory
+state that mirrors the database is updated through after_commit(), so it
+only changes once the write is durable.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import wraps
+from config import Config
+from db import get_pool, statement_count
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+class Writer(threading.Thread):
+    """Runs queued mutations against one database in group-committed batches"""
+
+    def __init__(self, database):
+        super().__init__(name='db-writer', daemon=True)
+        self.database = database
+        self.pid = os.getpid()
+        self.queue = queue.SimpleQueue()
+        self.cursor = None
+        self.callbacks = []
+        self.batches = 0
+        self.mutations = 0
+        self.statements = 0
+
+    def submit(self, func, args, kwargs):
+        future = Future()
+        self.queue.put((func, args, kwargs, future))
+        return future
+
+    def stop(self):
+        """Finish the mutations already queued, then exit"""
+        self.queue.put(None)
+        self.join()
+
+    def stats(self):
+        return {'batches': self.batches, 'mutations': self.mutations, 'statements': self.statements,
+                'per_batch': round(self.mutations / self.batches, 2) if self.batches else None}
+
+    def run(self):
+        conn = get_pool(self.database).connect()
+        conn.isolation_level = None  # Transactions are begun and committed explicitly
+        self.cursor = conn.cursor()
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._run_batch(batch)
+        finally:
+            conn.really_close()
+
+    def _next_batch(self):
+        """(mutations, stop requested): blocks for the first, then gathers until the window closes"""
+        item = self.queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + Config.WRITE_BATCH_WINDOW
+        while len(batch) < Config.WRITE_BATCH_MAX:
+            try:
+                item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run_batch(self, batch):
+        cursor = self.cursor
+        outcomes = []
+        statements = statement_count()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            for func, args, kwargs, future in batch:
+                cursor.execute('SAVEPOINT mutation')
+                callbacks = len(self.callbacks)
+                try:
+                    outcomes.append((future, func(cursor, *args, **kwargs), None))
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO mutation')
+                    del self.callbacks[callbacks:]
+                    outcomes.append((future, None, e))
+                cursor.execute('RELEASE mutation')
+            cursor.execute('COMMIT')
+        except Exception as e:
+            logger.exception("Write batch of %d failed", len(batch))
+            if cursor.connection.in_transaction:
+                cursor.execute('ROLLBACK')
+            self.callbacks.clear()
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.mutations += len(batch)
+        self.statements += statement_count() - statements
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("After-commit callback failed")
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def _usable(writer):
+    return writer is not None and writer.pid == os.getpid() and writer.is_alive()
+
+def get_writer(database=None):
+    """This process's writer for a database file (Config.DATABASE by default), started on first use"""
+    database = database or Config.DATABASE
+    writer = _writers.get(database)
+    if not _usable(writer):
+        with _writers_lock:
+            writer = _writers.get(database)
+            if not _usable(writer):
+                # Also replaces a writer inherited from the parent of a forked worker
+                writer = _writers[database] = Writer(database)
+                writer.start()
+    return writer
+
+def stop_writers():
+    """Drain and stop this process's writers"""
+    with _writers_lock:
+        for writer in _writers.values():
+            if _usable(writer):
+                writer.stop()
+        _writers.clear()
+
+atexit.register(stop_writers)
+
+def submit(func, *args, **kwargs):
+    """Queue func(cursor, *args, **kwargs) on the writer; returns a Future for its result"""
+    current = threading.current_thread()
+    if isinstance(current, Writer):
+        # Already inside a batch (a mutation calling another): run in the same transaction
+        future = Future()
+        try:
+            future.set_result(func(current.cursor, *args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return get_writer().submit(func, args, kwargs)
+
+def after_commit(callback):
+    """Call callback() once the running mutation has committed; dropped if it rolls back"""
+    current = threading.current_thread()
+    if isinstance(current, Writer):
+        current.callbacks.append(callback)
+    else:
+        callback()
+
+def mutation(func):
+    """Run func on the writer thread and wait for its batch to commit"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with span('write', mutation=func.__name__):
+            return submit(func, *args, **kwargs).result()
+    return wrapper
@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production.
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+
+app = create_app()